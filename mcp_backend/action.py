@@ -37,10 +37,15 @@ async def execute_tool_call(
 
             for argument in model_input_schema.keys():
                 if not argument in params.keys():
+                    # Fields with a default value are optional
+                    if not pydantic_model_class.model_fields[argument].is_required():
+                        continue
                     raise ValueError(f"{argument} parameter in not provided for {func_name}")
 
                 param_type = model_input_schema[argument]
                 value = params[argument]
+                if value is None and not pydantic_model_class.model_fields[argument].is_required():
+                    continue
 
                 #Convert the value to the correct type
                 if 'int' in param_type:
@@ -1,15 +1,24 @@
 import os
 import sys
+import time
 import asyncio
+from contextlib import asynccontextmanager, AsyncExitStack
 from dotenv import load_dotenv
 from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
-from perception import perceive_input
-from decision import make_decision
+from mcp.client.stdio import stdio_client, get_default_environment
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED
+from perception import perceive_input, parse_stats
+from decision import make_decision, build_decision_schema
 from action import execute_tool_call
+from planner import make_plan, parse_plan, compose_final_answer, PlanExecutor, PlanError
 from memory import MemoryManager
+from preferences import preference_store, parse_preferences
+from tool_retrieval import ToolIndex, extract_tools_discriptions
+from cassette import Cassette, RecordingSession, ReplaySession, active_cassette
 from google import genai
 import requests
+import anyio
 import logging
 
 # Configure logger
@@ -18,15 +27,48 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv("../token.env")
 api_key = os.getenv("API_TOKEN")
-client = genai.Client(api_key=api_key)
 
-class Agent:
+def is_connection_error(error: BaseException) -> bool:
+    """Return True if the error means the MCP server connection is gone, False for LLM, decision and tool errors"""
+    if isinstance(error, BaseExceptionGroup):
+        return any(is_connection_error(e) for e in error.exceptions)
+    if isinstance(error, McpError):
+        return error.error.code == CONNECTION_CLOSED
+    # LLM timeouts are TimeoutError, which is an OSError as well
+    if isinstance(error, TimeoutError):
+        return False
+    return isinstance(error, (OSError, anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream))
+
+class LazyClient:
+    """Gemini client created on first use, replaying a cassette makes no LLM calls and needs no API key"""
     def __init__(self):
+        self._client = None
+
+    def __getattr__(self, name):
+        if self._client is None:
+            self._client = genai.Client(api_key=api_key)
+        return getattr(self._client, name)
+
+client = LazyClient()
+
+class Agent:
+    def __init__(self, mode=None, cassette=None, keep_session=False, tool_top_k=None):
         self.memory_manager = MemoryManager()
         self.max_iterations = 3
         self.iteration = 0
         self.last_response = None
         self.iteration_response = []
+        # "react" makes one LLM call per tool call, "plan" plans all tool calls in one LLM call
+        self.mode = mode or os.environ.get('AGENT_MODE', 'react')
+        self.stats = {}
+        # Cassette to replay the session from, see cassette.py
+        self.cassette = cassette
+        # Keep the MCP server session open across runs, see job_service.py
+        self.keep_session = keep_session
+        self.session = None
+        self.exit_stack = None
+        # Number of tools picked by relevance for each prompt besides the core tools, 0 offers all tools
+        self.tool_top_k = tool_top_k if tool_top_k is not None else int(os.environ.get('AGENT_TOOL_TOP_K', 6))
         # Setup logger configuration with timestamp
         logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
@@ -63,137 +105,197 @@ class Agent:
             return False
 
     def extract_tools_discriptions(self, tools):
-        logger.info("Extracting tool descriptions")
-        """Get the descriptions of the tools available to the agent"""        
+        """Get the descriptions of the tools available to the agent"""
+        return extract_tools_discriptions(tools)
+
+    def load_user_preferences(self, user_preferences):
+        """Compile new user preferences into the preference store and render them for the prompt"""
+        # The web UI passes "undefined" when no preferences were entered
+        if user_preferences and user_preferences.strip() == "undefined":
+            user_preferences = None
+
+        cassette = active_cassette.get()
+        if cassette is not None and cassette.replaying:
+            # Replay the recorded preferences and leave the local preference store untouched
+            if "rendered_preferences" in cassette.header:
+                return cassette.header["rendered_preferences"]
+            logger.warning("Cassette holds no rendered preferences, compiling the recorded text")
+            return parse_preferences(user_preferences or "").render()
+
+        if user_preferences:
+            preference_store.update_from_text(user_preferences)
+        rendered = preference_store.get().render()
+        if cassette is not None:
+            cassette.header["rendered_preferences"] = rendered
+        return rendered
+
+    async def run_plan(self, session, user_prompt, user_preferences, tool_index):
+        """Plan all tool calls in one LLM call and execute them as a DAG"""
+        logger.info("\n--- Planning ---")
+        tools = tool_index.tools
+        tools_description = self.extract_tools_discriptions(tool_index.select(user_prompt, self.tool_top_k))
         try:
-            tools_description = []
-            for i, tool in enumerate(tools):
-                try:
-                    # Get tool properties
-                    params = tool.inputSchema
-                    desc = getattr(tool, 'description', 'No description available')
-                    name = getattr(tool, 'name', f'tool_{i}')
-                    
-                    # Format the input schema in a more readable way
-                    param_details = []
-                    
-                    # Check if we have $defs (Pydantic models)
-                    if '$defs' in params:
-                        # Get the input model name from the ref
-                        input_ref = params['properties']['input']['$ref']
-                        model_name = input_ref.split('/')[-1]
-                        
-                        # Get the model definition
-                        model_def = params['$defs'][model_name]
-                        
-                        # Extract parameters from the model
-                        for param_name, param_info in model_def['properties'].items():
-                            param_type = param_info.get('type', 'unknown')
-                            param_details.append(f"{param_name}: {param_type}")
-                    else:
-                        # Handle simple parameters
-                        for param_name, param_info in params.get('properties', {}).items():
-                            param_type = param_info.get('type', 'unknown')
-                            param_details.append(f"{param_name}: {param_type}")
-
-                    params_str = ', '.join(param_details) if param_details else 'no parameters'
-
-                    # Get return type from the tool's return type annotation
-                    return_type = getattr(tool, 'return_type', 'unknown')
-                    if hasattr(return_type, '__origin__'):
-                        if return_type.__origin__ is list:
-                            inner_type = return_type.__args__[0]
-                            if hasattr(inner_type, '__name__'):
-                                return_type_str = f"list[{inner_type.__name__}]"
-                            else:
-                                return_type_str = "list"
-                        else:
-                            return_type_str = str(return_type)
-                    elif hasattr(return_type, '__name__'):
-                        return_type_str = return_type.__name__
-                    else:
-                        return_type_str = str(return_type)
-
-                    tool_desc = f"{i+1}. {name}({params_str}) - {desc}"
-                    tools_description.append(tool_desc)
-                    print(f"Added description for tool: {tool_desc}")
-                except Exception as e:
-                    print(f"Error processing tool {i}: {e}")
-                    tools_description.append(f"{i+1}. Error processing tool")
+            plan = await make_plan(client, user_prompt, tools_description, user_preferences)
+            steps = parse_plan(plan)
+        except PlanError as e:
+            # A malformed plan has no step to repair, run the request through the react loop instead
+            logger.warning(f"Unusable plan, falling back to the react loop: {e}")
+            self.stats["llm_calls"] += 1
+            return await self.run_react(session, user_prompt, user_preferences, tool_index)
+        self.stats["llm_calls"] += 1
+
+        if not steps:
+            # Nothing to execute, the LLM is asking the user a question
+            logger.info(f"\n=== LLM final response is: {plan.get('your_comment', '')} ===")
+            return plan.get("your_comment", "")
+
+        executor = PlanExecutor(client, session, tools, tools_description)
+        await executor.execute(steps)
+        self.stats["llm_calls"] += executor.llm_calls
+        self.stats["tool_calls"] += executor.tool_calls
+        for step in steps.values():
+            self.iteration_response.append(step.describe())
+
+        final_response = await compose_final_answer(client, user_prompt, steps)
+        self.stats["llm_calls"] += 1
+        logger.info("\n=== Agent Execution Complete ===")
+        logger.info(f"\n=== LLM final response is: {final_response} ===")
+        return final_response
+
+    @asynccontextmanager
+    async def open_session(self, cassette=None):
+        """Open a session with the MCP server, or with the cassette being replayed"""
+        if cassette is not None and cassette.replaying:
+            logger.info(f"Replaying session from {cassette.path}")
+            yield ReplaySession(cassette)
+            return
+
+        # Create MCP server connection
+        logger.info("Establishing connection to MCP server...")
+        server_params = StdioServerParameters(
+            command="python",
+            args=["mcp_server.py"],
+            # Let the MCP server write its HTTP timings for the cassette
+            env={**get_default_environment(), "CASSETTE_HTTP_LOG": cassette.http_log_path} if cassette is not None else None
+        )
+
+        async with stdio_client(server_params) as (read, write):
+            logger.info("Connection established, creating session...")
+            async with ClientSession(read, write) as session:
+                logger.info("Session created, initializing...")
+                await session.initialize()
+                yield session if cassette is None else RecordingSession(session, cassette)
+
+    async def connect(self):
+        """Open a session with the MCP server that is kept across runs"""
+        self.exit_stack = AsyncExitStack()
+        self.session = await self.exit_stack.enter_async_context(self.open_session())
+
+    async def close(self):
+        """Close the session kept across runs"""
+        if self.exit_stack is not None:
+            exit_stack, self.exit_stack, self.session = self.exit_stack, None, None
+            try:
+                await exit_stack.aclose()
+            except Exception as e:
+                logger.error(f"Error closing MCP session: {e}")
+
+    async def run_session(self, session, user_prompt, user_preferences):
+        # Get available tools
+        logger.info("Requesting tool list...")
+        tools_result = await session.list_tools()
+        tools = tools_result.tools
+        logger.info(f"Successfully retrieved {len(tools)} tools")
+        tool_index = ToolIndex(tools)
+        # Render the preferences once per run
+        user_preferences = self.load_user_preferences(user_preferences)
+
+        if self.mode == "plan":
+            return await self.run_plan(session, user_prompt, user_preferences, tool_index)
+        return await self.run_react(session, user_prompt, user_preferences, tool_index)
+
+    async def run_react(self, session, user_prompt, user_preferences, tool_index):
+        """Decide on one tool call per LLM call until the LLM gives its final answer"""
+        tools = tool_index.tools
+        # Main execution loop
+        while self.iteration < self.max_iterations:
+            logger.info(f"\n--- Iteration {self.iteration + 1} ---")
             
-            tools_description = "\n".join(tools_description)
-            print("Successfully created tools description")
-        except Exception as e:
-            print(f"Error creating tools description: {e}")
-            tools_description = "Error loading tools"
+            # Perception phase
+            current_query = user_prompt if self.last_response is None else \
+                f"{user_prompt}\n\n{' '.join(self.iteration_response)}\nWhat should I do next?"
+
+            # Offer only the tools relevant to the query and history, constrain decisions to them
+            selected_tools = tool_index.select(current_query, self.tool_top_k)
+            tools_description = self.extract_tools_discriptions(selected_tools)
+            decision_schema = build_decision_schema(selected_tools)
 
-        return tools_description
+            # Decision phase
+            decision = await make_decision(client, current_query, tools_description, user_preferences, tools, decision_schema)
+            self.stats["llm_calls"] += 1
+            
+            if decision["final_iteration"] == "True":
+                logger.info("\n=== Agent Execution Complete ===")
+                logger.info(f"\n=== LLM final response is: {decision['your_comment']} ===")
+                return decision['your_comment']
+            
+            # Action phase
+            tool_result = await execute_tool_call(session, decision, tools)
+            self.stats["tool_calls"] += 1
+            print(f"INFO: tool result: {tool_result} and type: {type(tool_result)}")
+            
+            # Update memory and state
+            self.iteration_response.append(
+                f"In the {self.iteration + 1} iteration you called {decision['function_name']} "
+                f"with {decision['parameters']} parameters, and the function returned {tool_result}."
+            )
+            self.last_response = tool_result
+            self.iteration += 1
 
     async def run(self, user_prompt, user_preferences):
         self.reset_state()
+        self.stats = {"mode": self.mode, "llm_calls": 0, "tool_calls": 0, "wall_time": 0.0}
+        parse_stats_start = dict(parse_stats)
+        start_time = time.perf_counter()
         logger.info("Starting main execution...")
-        
-        try:
-            # Create MCP server connection
-            logger.info("Establishing connection to MCP server...")
-            server_params = StdioServerParameters(
-                command="python",
-                args=["mcp_server.py"]
-            )
 
-            async with stdio_client(server_params) as (read, write):
-                logger.info("Connection established, creating session...")
-                async with ClientSession(read, write) as session:
-                    logger.info("Session created, initializing...")
-                    await session.initialize()
-                    
-                    # Get available tools
-                    logger.info("Requesting tool list...")
-                    tools_result = await session.list_tools()
-                    tools = tools_result.tools
-                    logger.info(f"Successfully retrieved {len(tools)} tools")
-                    tools_description = self.extract_tools_discriptions(tools)
-
-                    # Main execution loop
-                    while self.iteration < self.max_iterations:
-                        logger.info(f"\n--- Iteration {self.iteration + 1} ---")
-                        
-                        # Perception phase
-                        current_query = user_prompt if self.last_response is None else \
-                            f"{user_prompt}\n\n{' '.join(self.iteration_response)}\nWhat should I do next?"
-                        
-                        # Update memory with user preferences and save it permanently
-                        if user_preferences is not None:
-                            self.memory_manager.add_memory(f"User preferences: {user_preferences}")
-                            self.memory_manager.save_memories("user_preferences.json")
-                        elif user_preferences is None and os.path.exists("user_preferences.json"):
-                            self.memory_manager.load_memories("user_preferences.json")
-
-                        # Decision phase
-                        decision = await make_decision(client, current_query, tools_description, self.memory_manager)
-                        
-                        if decision["final_iteration"] == "True":
-                            logger.info("\n=== Agent Execution Complete ===")
-                            logger.info(f"\n=== LLM final response is: {decision['your_comment']} ===")
-                            return decision['your_comment']
-                        
-                        # Action phase
-                        tool_result = await execute_tool_call(session, decision, tools)
-                        print(f"INFO: tool result: {tool_result} and type: {type(tool_result)}")
-                        
-                        # Update memory and state
-                        self.iteration_response.append(
-                            f"In the {self.iteration + 1} iteration you called {decision['function_name']} "
-                            f"with {decision['parameters']} parameters, and the function returned {tool_result}."
-                        )
-                        self.last_response = tool_result
-                        self.iteration += 1
+        # Record the session when a cassette directory is configured
+        cassette = self.cassette
+        if cassette is None and os.environ.get('AGENT_RECORD_DIR'):
+            cassette = Cassette.for_recording(os.environ['AGENT_RECORD_DIR'])
+        if cassette is not None and not cassette.replaying:
+            cassette.header.update({"user_prompt": user_prompt, "user_preferences": user_preferences, "mode": self.mode})
+        cassette_token = active_cassette.set(cassette)
+
+        result = None
+        try:
+            if self.keep_session and not (cassette is not None and cassette.replaying):
+                if self.session is None:
+                    await self.connect()
+                # HTTP timings are not recorded on a kept session, the MCP server was started without a cassette
+                session = self.session if cassette is None else RecordingSession(self.session, cassette)
+                result = await self.run_session(session, user_prompt, user_preferences)
+            else:
+                async with self.open_session(cassette) as session:
+                    result = await self.run_session(session, user_prompt, user_preferences)
+            return result
 
         except Exception as e:
             logger.error(f"Error in main execution: {e}")
             import traceback
             traceback.print_exc()
+            # Reconnect on the next run only if the MCP server is gone, other errors keep the warm session
+            if is_connection_error(e):
+                await self.close()
         finally:
+            self.stats["wall_time"] = time.perf_counter() - start_time
+            self.stats["parse"] = {key: parse_stats[key] - parse_stats_start[key] for key in parse_stats}
+            self.stats["llm_calls"] += self.stats["parse"]["retries"]
+            logger.info(f"Run stats: {self.stats}")
+            if cassette is not None and not cassette.replaying:
+                cassette.header.update({"result": result, "stats": self.stats})
+                cassette.save()
+            active_cassette.reset(cassette_token)
             self.reset_state()
 
 async def main():
@@ -0,0 +1,65 @@
+import sys
+import time
+import random
+from datetime import datetime, timedelta
+from reminder_scheduler import ReminderScheduler, reminder_due_time
+
+def make_reminders(count: int, start: datetime, days: int = 30) -> list:
+    """Create reminders spread at random minutes over the given number of days"""
+    reminders = []
+    for i in range(count):
+        due = start + timedelta(minutes=random.randrange(days * 24 * 60))
+        reminders.append({
+            "id": f"r{i}",
+            "type": "reminder",
+            "date": due.strftime("%Y-%m-%d"),
+            "time": due.strftime("%H:%M"),
+            "content": f"reminder {i}",
+            "triggered": False
+        })
+    return reminders
+
+def timed(label: str, count: int, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed * 1000:>10.1f} ms  {elapsed / count * 1e6:>8.2f} us/op")
+    return result
+
+def linear_scan(reminders: list, now: float) -> list:
+    """What the browser reminder checker does on every check"""
+    return [r for r in reminders if not r["triggered"] and reminder_due_time(r) <= now]
+
+def benchmark(count: int = 100_000):
+    random.seed(0)
+    start = datetime.now().replace(second=0, microsecond=0)
+    reminders = make_reminders(count, start)
+    scheduler = ReminderScheduler()
+    print(f"Benchmarking with {count} pending reminders\n")
+
+    timed("schedule all", count, lambda: [scheduler.schedule(r) for r in reminders])
+    timed("next_due", 1000, lambda: [scheduler.next_due() for _ in range(1000)])
+
+    changed = random.sample(reminders, count // 10)
+    timed("cancel 10%", len(changed), lambda: [scheduler.cancel(r["id"]) for r in changed])
+    timed("reschedule 10%", len(changed), lambda: [scheduler.schedule(r) for r in changed])
+
+    # Fire everything with one tick per minute, as the timer loop would
+    minutes = 30 * 24 * 60
+    fired = []
+    timed("fire all, one tick per minute", count, lambda: [
+        fired.extend(scheduler.pop_due((start + timedelta(minutes=m)).timestamp())) for m in range(minutes + 1)
+    ])
+    print(f"fired {len(fired)} reminders, {len(scheduler)} pending, heap size {len(scheduler.heap)}\n")
+
+    # The browser checker scans every pending reminder on every check, once a minute per client
+    now = start.timestamp()
+    timed("browser linear scan, one check", count, lambda: linear_scan(reminders, now))
+    scan = time.perf_counter()
+    for _ in range(10):
+        linear_scan(reminders, now)
+    per_check = (time.perf_counter() - scan) / 10
+    print(f"browser checker over the same 30 days: {per_check * minutes:.1f} s per client, up to 60 s late per reminder")
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,234 @@
+import os
+import sys
+import json
+import gzip
+import time
+import uuid
+import asyncio
+import hashlib
+import contextvars
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from pydantic_core import to_jsonable_python
+from mcp.types import Tool, ListToolsResult, CallToolResult
+import logging
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+CASSETTE_VERSION = 1
+
+# Cassette of the agent session running in the current task, None when not recording or replaying
+active_cassette = contextvars.ContextVar("active_cassette", default=None)
+
+class ReplayError(Exception):
+    """Raised when a replayed session asks for something the cassette does not hold"""
+
+def prompt_digest(prompt: str) -> str:
+    return hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+
+def arguments_key(name: str, arguments: Optional[Dict[str, Any]]) -> str:
+    return f"{name}:{json.dumps(to_jsonable_python(arguments or {}), sort_keys=True)}"
+
+class Cassette:
+    """
+    Recording of one agent session: prompts, LLM responses, tool calls, tool
+    results and HTTP timings, stored as gzip compressed JSON lines.
+    The first line is the header, every following line is one event.
+    """
+    def __init__(self, path: str, replaying: bool = False, real_timing: bool = True):
+        self.path = path
+        self.replaying = replaying
+        self.real_timing = real_timing
+        self.header: Dict[str, Any] = {"version": CASSETTE_VERSION, "tools": []}
+        self.events: List[Dict[str, Any]] = []
+        self.http_log_path = None if replaying else f"{path}.http.jsonl"
+        self.start_time = time.perf_counter()
+        self.llm_queue = deque()
+        self.tool_queues = defaultdict(deque)
+
+    @classmethod
+    def for_recording(cls, directory: str) -> "Cassette":
+        """Create a new cassette in the given directory"""
+        os.makedirs(directory, exist_ok=True)
+        name = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.cassette.gz"
+        cassette = cls(os.path.join(directory, name))
+        cassette.header["recorded_at"] = datetime.now().isoformat()
+        return cassette
+
+    @classmethod
+    def load(cls, path: str, real_timing: bool = True) -> "Cassette":
+        """Load a cassette for replaying"""
+        cassette = cls(path, replaying=True, real_timing=real_timing)
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            cassette.header = json.loads(f.readline())
+            cassette.events = [json.loads(line) for line in f if line.strip()]
+
+        if cassette.header.get("version") != CASSETTE_VERSION:
+            raise ReplayError(f"Unsupported cassette version: {cassette.header.get('version')}")
+
+        for event in cassette.events:
+            if event["type"] == "llm":
+                cassette.llm_queue.append(event)
+            elif event["type"] == "tool":
+                cassette.tool_queues[event["key"]].append(event)
+        return cassette
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start_time
+
+    def record_llm(self, prompt: str, response: Optional[str], duration: float, error: Optional[str] = None):
+        self.events.append({
+            "type": "llm",
+            "t": round(self.elapsed() - duration, 6),
+            "duration": round(duration, 6),
+            "prompt": prompt,
+            "prompt_sha1": prompt_digest(prompt),
+            "response": response,
+            "error": error
+        })
+
+    def record_tool(self, name: str, arguments: Optional[Dict[str, Any]], result: Optional[CallToolResult], duration: float, error: Optional[str] = None):
+        self.events.append({
+            "type": "tool",
+            "t": round(self.elapsed() - duration, 6),
+            "duration": round(duration, 6),
+            "name": name,
+            "arguments": to_jsonable_python(arguments or {}),
+            "key": arguments_key(name, arguments),
+            "result": result.model_dump(mode="json") if result is not None else None,
+            "error": error
+        })
+
+    def record_http_log(self):
+        """Merge the HTTP timings written by the MCP server into the cassette"""
+        if not self.http_log_path or not os.path.exists(self.http_log_path):
+            return
+        with open(self.http_log_path, "r") as f:
+            for line in f:
+                if line.strip():
+                    event = json.loads(line)
+                    event["type"] = "http"
+                    self.events.append(event)
+        os.remove(self.http_log_path)
+
+    def save(self):
+        """Write the cassette to disk"""
+        self.record_http_log()
+        with gzip.open(self.path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps(self.header, separators=(",", ":")) + "\n")
+            for event in self.events:
+                f.write(json.dumps(event, separators=(",", ":")) + "\n")
+        logger.info(f"Saved session cassette to {self.path}")
+
+    async def wait(self, event: Dict[str, Any]):
+        if self.real_timing:
+            await asyncio.sleep(event["duration"])
+
+    async def replay_llm(self, prompt: str) -> str:
+        """Return the next recorded LLM response"""
+        if not self.llm_queue:
+            raise ReplayError("No recorded LLM response left in cassette")
+        event = self.llm_queue.popleft()
+        if event["prompt_sha1"] != prompt_digest(prompt):
+            logger.warning("Replayed prompt differs from the recorded prompt")
+        await self.wait(event)
+        if event["error"] is not None:
+            raise RuntimeError(event["error"])
+        return event["response"]
+
+    async def replay_tool(self, name: str, arguments: Optional[Dict[str, Any]]) -> CallToolResult:
+        """Return the recorded result of a tool call, matched on name and arguments"""
+        queue = self.tool_queues.get(arguments_key(name, arguments))
+        if not queue:
+            raise ReplayError(f"No recorded result for {name} with {to_jsonable_python(arguments)}")
+        event = queue.popleft()
+        await self.wait(event)
+        if event["error"] is not None:
+            raise RuntimeError(event["error"])
+        return CallToolResult.model_validate(event["result"])
+
+class RecordingSession:
+    """Proxy for a ClientSession that records tool listings and tool calls"""
+    def __init__(self, session: Any, cassette: Cassette):
+        self.session = session
+        self.cassette = cassette
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    async def list_tools(self) -> ListToolsResult:
+        result = await self.session.list_tools()
+        self.cassette.header["tools"] = [tool.model_dump(mode="json") for tool in result.tools]
+        return result
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None) -> CallToolResult:
+        start = time.perf_counter()
+        try:
+            result = await self.session.call_tool(name, arguments=arguments)
+        except Exception as e:
+            self.cassette.record_tool(name, arguments, None, time.perf_counter() - start, str(e))
+            raise
+        self.cassette.record_tool(name, arguments, result, time.perf_counter() - start)
+        return result
+
+class ReplaySession:
+    """Stand-in for a ClientSession that serves tools and tool results from a cassette"""
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+
+    async def initialize(self):
+        pass
+
+    async def list_tools(self) -> ListToolsResult:
+        return ListToolsResult(tools=[Tool.model_validate(tool) for tool in self.cassette.header["tools"]])
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None) -> CallToolResult:
+        return await self.cassette.replay_tool(name, arguments)
+
+def summarize(cassette: Cassette) -> str:
+    """Summarize where the time of a recorded session went"""
+    totals = defaultdict(lambda: [0, 0.0])
+    for event in cassette.events:
+        label = event["type"] if event["type"] == "llm" else f"{event['type']} {event.get('name') or event.get('method', '')}".strip()
+        totals[label][0] += 1
+        totals[label][1] += event.get("duration", 0.0)
+
+    lines = [f"{'event':<30} {'count':>5} {'total':>9}"]
+    for label, (count, duration) in sorted(totals.items(), key=lambda item: -item[1][1]):
+        lines.append(f"{label:<30} {count:>5} {duration:>8.3f}s")
+    return "\n".join(lines)
+
+async def replay(path: str, real_timing: bool = True):
+    """Run Agent.run deterministically against a cassette"""
+    from agent import Agent
+
+    cassette = Cassette.load(path, real_timing=real_timing)
+    header = cassette.header
+    agent = Agent(mode=header.get("mode"), cassette=cassette)
+    result = await agent.run(header["user_prompt"], header.get("user_preferences"))
+
+    print(f"\nRecorded session:\n{summarize(cassette)}")
+    print(f"\nRecorded stats: {header.get('stats')}")
+    print(f"Replayed stats: {agent.stats}")
+    if result != header.get("result"):
+        print(f"Replayed result differs from the recorded result:\n  recorded: {header.get('result')}\n  replayed: {result}")
+    return result
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python cassette.py <cassette> [--fast] [--profile]")
+        sys.exit(1)
+
+    real_timing = "--fast" not in sys.argv
+    if "--profile" in sys.argv:
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        profiler.enable()
+        asyncio.run(replay(sys.argv[1], real_timing))
+        profiler.disable()
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(30)
+    else:
+        asyncio.run(replay(sys.argv[1], real_timing))
@@ -0,0 +1,108 @@
+import json
+import time
+import asyncio
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import agent
+from agent import Agent
+
+# Multi-step requests where the react loop needs one LLM call per tool call
+DEFAULT_PROMPTS = [
+    "Create a todo to buy groceries today and mark it as done",
+    "Add a reminder at 18:00 today to call mom and an event tomorrow for the team lunch",
+    "What do I have planned for today? List my todos, events and reminders",
+]
+
+# Request and tool calls answered by the simulated LLM
+SIMULATED_PROMPT = "List my todos and events for 2025-05-01"
+SIMULATED_TOOLS = ["list_todos", "list_events"]
+
+class SimulatedResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+class SimulatedModels:
+    """
+    Stand-in for the Gemini models API answering SIMULATED_PROMPT after a fixed delay:
+    the react loop calls one tool per LLM call, the planner plans all tools as independent steps
+    """
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def generate_content(self, model=None, contents=None, config=None) -> SimulatedResponse:
+        time.sleep(self.delay)
+        prompt = str(contents)
+        parameters = {"date": "2025-05-01"}
+        if "plan of steps" in prompt:
+            steps = [{"id": f"s{i + 1}", "function_name": name, "parameters": parameters, "depends_on": []}
+                     for i, name in enumerate(SIMULATED_TOOLS)]
+            return SimulatedResponse(json.dumps({"steps": steps, "your_comment": ""}))
+        if "final_iteration" not in prompt:
+            return SimulatedResponse(json.dumps({"your_comment": "You have nothing planned."}))
+
+        called = prompt.count(" iteration you called ")
+        if called < len(SIMULATED_TOOLS):
+            decision = {"final_iteration": "False", "your_comment": "", "function_name": SIMULATED_TOOLS[called], "parameters": parameters}
+        else:
+            decision = {"final_iteration": "True", "your_comment": "You have nothing planned.", "function_name": "", "parameters": {}}
+        return SimulatedResponse(json.dumps(decision))
+
+class SimulatedClient:
+    def __init__(self, delay: float):
+        self.models = SimulatedModels(delay)
+
+def start_simulated_store(delay: float, port: int = 3000) -> ThreadingHTTPServer:
+    """Serve an empty NoteTaker store on the port the MCP server calls, answering after a fixed delay"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            body = b"[]"
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("localhost", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+async def compare(prompts, user_preferences=None):
+    """Run every prompt in react and plan mode and report LLM calls and wall time"""
+    rows = []
+    for prompt in prompts:
+        for mode in ("react", "plan"):
+            agent = Agent(mode=mode)
+            result = await agent.run(prompt, user_preferences)
+            rows.append((prompt, mode, agent.stats["llm_calls"], agent.stats["tool_calls"], agent.stats["wall_time"], result))
+
+    print(f"\n{'mode':<6} {'llm calls':>9} {'tool calls':>10} {'wall time':>10}  prompt")
+    for prompt, mode, llm_calls, tool_calls, wall_time, result in rows:
+        print(f"{mode:<6} {llm_calls:>9} {tool_calls:>10} {wall_time:>9.2f}s  {prompt[:60]}")
+
+    for mode in ("react", "plan"):
+        mode_rows = [row for row in rows if row[1] == mode]
+        llm_calls = sum(row[2] for row in mode_rows) / len(mode_rows)
+        wall_time = sum(row[4] for row in mode_rows) / len(mode_rows)
+        print(f"{mode}: {llm_calls:.2f} LLM calls and {wall_time:.2f}s wall time per request on average")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare LLM calls and wall time of the react loop and plan mode")
+    parser.add_argument("prompts", nargs="*", help="Requests to run, defaults to a few multi-step requests")
+    parser.add_argument("--simulate", type=float, default=None,
+                        help="Answer with a simulated LLM taking this many seconds per call, and a simulated store, instead of Gemini and the NoteTaker server")
+    parser.add_argument("--store-delay", type=float, default=0.3, help="Seconds the simulated store takes per request")
+    parser.add_argument("--runs", type=int, default=3, help="Runs of the simulated request")
+    args = parser.parse_args()
+
+    if args.simulate is not None:
+        agent.client = SimulatedClient(args.simulate)
+        store = start_simulated_store(args.store_delay)
+        asyncio.run(compare([SIMULATED_PROMPT] * args.runs))
+        store.shutdown()
+    else:
+        asyncio.run(compare(args.prompts or DEFAULT_PROMPTS))
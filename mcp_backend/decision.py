@@ -1,45 +1,130 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from google import genai
-from perception import perceive_input
+from perception import perceive_input, parse_stats
 from system_prompt_template import system_prompt
 import logging
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
+# JSON schema types the Gemini response schema understands
+SCHEMA_TYPES = {"string", "integer", "number", "boolean", "array"}
+
+def tool_parameters(tool: Any) -> Dict[str, Dict[str, Any]]:
+    """Return the JSON schema of every parameter of a tool, unwrapping Pydantic input models"""
+    params = tool.inputSchema
+    if '$defs' in params:
+        model_name = params['properties']['input']['$ref'].split('/')[-1]
+        return params['$defs'][model_name]['properties']
+    return params.get('properties', {})
+
+def parameter_schema(param_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a parameter's JSON schema to a nullable Gemini response schema"""
+    # Optional fields are described as anyOf the type and null
+    for option in param_info.get('anyOf', []):
+        if option.get('type', 'null') != 'null':
+            param_info = option
+            break
+
+    param_type = param_info.get('type')
+    if param_type not in SCHEMA_TYPES:
+        param_type = 'string'
+    schema = {"type": param_type, "nullable": True}
+    if param_type == 'array':
+        item_type = param_info.get('items', {}).get('type')
+        schema["items"] = {"type": item_type if item_type in SCHEMA_TYPES - {'array'} else 'string'}
+    return schema
+
+def build_decision_schema(tools: List[Any]) -> Dict[str, Any]:
+    """
+    Build the response schema of a decision from the tool registry.
+    function_name is an enum of the tool names and parameters holds the typed
+    parameters of all tools, normalize_decision keeps the ones of the chosen tool.
+    """
+    parameters = {}
+    for tool in tools:
+        for param_name, param_info in tool_parameters(tool).items():
+            parameters.setdefault(param_name, parameter_schema(param_info))
+
+    return {
+        "type": "object",
+        "properties": {
+            "final_iteration": {"type": "string", "enum": ["True", "False"]},
+            "your_comment": {"type": "string"},
+            "function_name": {"type": "string", "enum": [tool.name for tool in tools] + [""]},
+            "parameters": {"type": "object", "properties": parameters, "nullable": True}
+        },
+        "required": ["final_iteration", "your_comment", "function_name", "parameters"],
+        "property_ordering": ["final_iteration", "your_comment", "function_name", "parameters"]
+    }
+
+def normalize_decision(decision: Dict[str, Any], tools: Optional[List[Any]] = None) -> Dict[str, Any]:
+    """
+    Fill in missing decision keys and check the tool call against the tool registry.
+    Raises ValueError when the decision cannot be used.
+    """
+    function_name = decision.get("function_name") or ""
+    your_comment = decision.get("your_comment") or ""
+    final_iteration = decision.get("final_iteration")
+    if final_iteration is None:
+        if not function_name and not your_comment:
+            raise ValueError("Invalid decision structure from LLM")
+        final_iteration = not function_name
+    final_iteration = "True" if str(final_iteration).strip().lower() == "true" else "False"
+
+    parameters = decision.get("parameters") or {}
+    if not isinstance(parameters, dict):
+        raise ValueError("Invalid decision parameters from LLM")
+
+    if final_iteration == "False":
+        if not function_name:
+            raise ValueError("No function_name in decision from LLM")
+        if tools is not None:
+            tool = next((t for t in tools if t.name == function_name), None)
+            if tool is None:
+                raise ValueError(f"Unknown tool: {function_name}")
+            # Keep only the parameters of the chosen tool
+            allowed = tool_parameters(tool)
+            parameters = {key: value for key, value in parameters.items() if key in allowed and value is not None}
+
+    return {
+        "final_iteration": final_iteration,
+        "your_comment": your_comment,
+        "function_name": function_name,
+        "parameters": parameters
+    }
+
 async def make_decision(
     client: genai.Client,
     current_query: str,
     tools_description: str,
-    memory_manager: Any
+    user_preferences: str,
+    tools: Optional[List[Any]] = None,
+    decision_schema: Optional[Dict[str, Any]] = None,
+    max_retries: int = 1
 ) -> Dict[str, Any]:
     """
     Make a decision about the next action based on:
     - Current query
     - Available tools
-    - Retrieved memories
+    - Rendered user preferences
+    Malformed decisions are repaired locally, the LLM is asked again at most max_retries times.
     """
-    try:
-        global system_prompt
-        # Get user preferences if present
-        relevant_memories = memory_manager.retrieve_memories("user preferences")
-
-        # Update system prompt with user preferences
-        if relevant_memories:   
-            relevant_memories = "- " + (relevant_memories[0]["content"].split(":")[-1])
-            relevant_memories = "\n- ".join(relevant_memories.split(","))
-            system_prompt = system_prompt.replace("_user_preferences_", relevant_memories)
-        
-        # Get decision from LLM
-        decision = await perceive_input(client, current_query, system_prompt.replace("_tools_description_", tools_description))
-        
-        # Validate decision structure
-        required_keys = ['final_iteration', 'your_comment', 'function_name', 'parameters']
-        if not all(key in decision for key in required_keys):
-            raise ValueError("Invalid decision structure from LLM")
-            
-        return decision
-        
-    except Exception as e:
-        logger.error(f"Error in decision making: {e}")
-        raise 
\ No newline at end of file
+    # Update system prompt with user preferences
+    prompt = system_prompt.replace("_user_preferences_", user_preferences)
+    prompt = prompt.replace("_tools_description_", tools_description)
+
+    for attempt in range(max_retries + 1):
+        try:
+            # Get decision from LLM
+            decision = await perceive_input(client, current_query, prompt, response_schema=decision_schema)
+            return normalize_decision(decision, tools)
+        except ValueError as e:
+            logger.error(f"Error in decision making: {e}")
+            if attempt == max_retries:
+                raise
+            parse_stats["retries"] += 1
+            logger.info(f"Retrying decision ({attempt + 1}/{max_retries})")
+        except Exception as e:
+            logger.error(f"Error in decision making: {e}")
+            raise
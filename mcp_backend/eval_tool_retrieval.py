@@ -0,0 +1,117 @@
+import io
+import os
+import sys
+import glob
+import asyncio
+import argparse
+import logging
+from mcp.types import Tool
+from contextlib import redirect_stdout
+from tool_retrieval import ToolIndex, extract_tools_discriptions
+from cassette import Cassette
+
+# Queries with the tools a correct run calls, SYNONYMS in tool_retrieval.py was tuned on these
+LABELED_QUERIES = [
+    ("Need to buy groceries tomorrow", ["get_current_date", "create_todo"]),
+    ("What do I have to do today?", ["get_current_date", "list_todos"]),
+    ("Mark the groceries todo as done", ["get_current_date", "list_todos", "complete_todo"]),
+    ("I did not finish the report yet, reopen that task", ["get_current_date", "list_todos", "uncomplete_todo"]),
+    ("Remove the dentist todo from today", ["get_current_date", "list_todos", "delete_todo"]),
+    ("Schedule a team lunch on Friday", ["get_current_date", "get_current_day", "create_event"]),
+    ("What meetings do I have tomorrow?", ["get_current_date", "list_events"]),
+    ("Cancel the team sync meeting today", ["get_current_date", "list_events", "delete_event"]),
+    ("Remind me to call mom at 6pm", ["get_current_date", "create_reminder"]),
+    ("Which reminders are set for today?", ["get_current_date", "list_reminders"]),
+    ("Delete my reminder about the gym", ["get_current_date", "list_reminders", "delete_reminder"]),
+    ("Find me an hour Thursday afternoon", ["get_current_date", "get_current_day", "find_free_slots"]),
+    ("When am I free this week?", ["get_current_date", "find_free_slots"]),
+    ("Does a call at 3pm tomorrow clash with anything?", ["get_current_date", "check_conflicts"]),
+    ("What day of the week is 2025-05-01?", ["get_day_of_week"]),
+    ("What time is it?", ["get_current_time"]),
+]
+
+# Queries written without the words in SYNONYMS, to measure recall on wording the index was not tuned for
+HELD_OUT_QUERIES = [
+    ("Put pay rent on my to-do list for the 1st", ["get_current_date", "create_todo"]),
+    ("Tick off the laundry item", ["get_current_date", "list_todos", "complete_todo"]),
+    ("Oops, the laundry isn't actually complete, mark it pending again", ["get_current_date", "list_todos", "uncomplete_todo"]),
+    ("Get rid of the call plumber todo", ["get_current_date", "list_todos", "delete_todo"]),
+    ("Set up a dinner with Sam on Saturday evening from 7 to 9", ["get_current_date", "get_current_day", "create_event"]),
+    ("What's on my calendar this Friday?", ["get_current_date", "get_current_day", "list_events"]),
+    ("Drop the dentist visit from my calendar", ["get_current_date", "list_events", "delete_event"]),
+    ("Ping me at 8am to take my medication", ["get_current_date", "create_reminder"]),
+    ("Any alerts coming up tonight?", ["get_current_date", "list_reminders"]),
+    ("Stop the alert about watering plants", ["get_current_date", "list_reminders", "delete_reminder"]),
+    ("I need a 45 minute window next Tuesday for a haircut", ["get_current_date", "get_current_day", "find_free_slots"]),
+    ("Would a 2pm call on Monday collide with something?", ["get_current_date", "get_current_day", "check_conflicts"]),
+    ("What day is Christmas this year?", ["get_current_date", "get_day_of_week"]),
+    ("How late is it right now?", ["get_current_time"]),
+    ("List everything I have on the 12th", ["get_current_date", "list_todos", "list_events", "list_reminders"]),
+    ("Move my standup on Thursday to 11", ["get_current_date", "get_current_day", "list_events", "delete_event", "create_event"]),
+]
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, about four characters per token"""
+    return max(1, len(text) // 4)
+
+def load_cassette_cases(directory: str) -> list:
+    """Use recorded sessions as cases: the user prompt and the tools the LLM actually called"""
+    cases = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.cassette.gz"))):
+        cassette = Cassette.load(path, real_timing=False)
+        called = sorted({event["name"] for event in cassette.events if event["type"] == "tool"})
+        if called and cassette.header.get("user_prompt"):
+            cases.append((cassette.header["user_prompt"], called))
+    return cases
+
+async def registry_tools() -> list:
+    """Tools registered on the MCP server, without starting it"""
+    import mcp_server
+    return [Tool.model_validate(tool.model_dump()) for tool in await mcp_server.mcp.list_tools()]
+
+def describe(tools: list) -> str:
+    """The tool descriptions the agent puts in its prompt, without their progress output"""
+    with redirect_stdout(io.StringIO()):
+        return extract_tools_discriptions(tools)
+
+def evaluate(tools: list, cases: list, k: int, label: str):
+    index = ToolIndex(tools)
+    full_tokens = estimate_tokens(describe(tools))
+
+    recalls, misses, selected_tokens = [], [], []
+    for query, called in cases:
+        selected = {tool.name for tool in index.select(query, k)}
+        found = [name for name in called if name in selected]
+        recalls.append(len(found) / len(called))
+        if len(found) < len(called):
+            misses.append((query, sorted(set(called) - selected)))
+        selected_tokens.append(estimate_tokens(describe([tool for tool in tools if tool.name in selected])))
+
+    average_tokens = sum(selected_tokens) / len(selected_tokens)
+    print(f"\n{label}, k={k}: {len(cases)} cases, {len(tools)} tools")
+    print(f"recall of called tools: {sum(recalls) / len(recalls):.3f}, full recall on {sum(r == 1.0 for r in recalls)}/{len(cases)} cases")
+    print(f"tool description tokens per prompt: {average_tokens:.0f} instead of {full_tokens} "
+          f"({1 - average_tokens / full_tokens:.0%} saved)")
+    for query, missed in misses:
+        print(f"  missed {missed} for: {query}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate relevance-based tool selection")
+    parser.add_argument("--k", default="4,6,8", help="Comma separated top-k values to evaluate")
+    parser.add_argument("--cassettes", default=None, help="Directory of recorded sessions to use as cases")
+    args = parser.parse_args()
+
+    tools = asyncio.run(registry_tools())
+    # The per query selection log would drown the report
+    logging.getLogger("tool_retrieval").setLevel(logging.WARNING)
+    if args.cassettes:
+        case_sets = [("recorded sessions", load_cassette_cases(args.cassettes))]
+    else:
+        case_sets = [("tuned queries", LABELED_QUERIES), ("held-out queries", HELD_OUT_QUERIES)]
+    if not any(cases for _, cases in case_sets):
+        print("No cases to evaluate")
+        sys.exit(1)
+
+    for label, cases in case_sets:
+        for k in [int(k) for k in args.k.split(",")]:
+            evaluate(tools, cases, k, label)
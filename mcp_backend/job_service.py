@@ -0,0 +1,304 @@
+import os
+import time
+import uuid
+import asyncio
+import argparse
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
+from typing import Dict, Any, Optional
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from contextlib import asynccontextmanager
+import logging
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+class QueueFullError(Exception):
+    """Raised when a job is rejected because the queue is at its bound"""
+
+class Job:
+    def __init__(self, user: str, text: str, preferences: Optional[str]):
+        self.id = uuid.uuid4().hex
+        self.user = user
+        self.text = text
+        self.preferences = preferences
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.stats = None
+        self.worker = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = asyncio.Event()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "user": self.user,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "stats": self.stats,
+            "worker": self.worker,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+def worker_main(worker_id: int, job_queue, result_queue, simulate: Optional[float]):
+    """Worker process holding a warm Agent, runs one job at a time"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    async def work():
+        agent = None
+        if simulate is None:
+            from agent import Agent
+            agent = Agent(keep_session=True)
+            await agent.connect()
+        result_queue.put(("ready", worker_id, None, None, None))
+
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await loop.run_in_executor(None, job_queue.get)
+            if job is None:
+                break
+            job_id, text, preferences = job
+            try:
+                if agent is None:
+                    # Stand-in for the LLM and tool calls, used by load_test_jobs.py
+                    await asyncio.sleep(simulate)
+                    result, stats = f"Simulated result for: {text}", {}
+                else:
+                    result = await agent.run(text, preferences)
+                    stats = agent.stats
+                    if result is not None:
+                        agent.send_text_to_ui(result)
+                if result is None:
+                    result_queue.put(("failed", worker_id, job_id, "Agent returned no result", stats))
+                else:
+                    result_queue.put(("done", worker_id, job_id, result, stats))
+            except Exception as e:
+                result_queue.put(("failed", worker_id, job_id, str(e), None))
+
+        if agent is not None:
+            await agent.close()
+
+    asyncio.run(work())
+
+class JobService:
+    """
+    Bounded job queue in front of a pool of worker processes with warm agents.
+    Jobs are dispatched round robin across users, so one user cannot starve the others.
+    """
+    def __init__(self, workers: int = 4, max_queue: int = 64, max_per_user: int = 16, max_finished: int = 1000, simulate: Optional[float] = None):
+        self.worker_count = workers
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self.max_finished = max_finished
+        self.simulate = simulate
+        self.context = multiprocessing.get_context("spawn")
+        self.result_queue = self.context.Queue()
+        self.workers = {}
+        self.idle = deque()
+        self.running = {}
+        # user -> queued jobs, in round robin order
+        self.queues: "OrderedDict[str, deque]" = OrderedDict()
+        self.queued = 0
+        self.jobs: Dict[str, Job] = {}
+        self.finished = deque()
+        self.loop = None
+
+    def start_worker(self, worker_id: int):
+        job_queue = self.context.Queue()
+        process = self.context.Process(
+            target=worker_main,
+            args=(worker_id, job_queue, self.result_queue, self.simulate),
+            daemon=True
+        )
+        process.start()
+        self.workers[worker_id] = (process, job_queue)
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        for worker_id in range(self.worker_count):
+            self.start_worker(worker_id)
+        threading.Thread(target=self.read_results, daemon=True).start()
+
+    def stop(self):
+        for process, job_queue in self.workers.values():
+            job_queue.put(None)
+        for process, _ in self.workers.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.result_queue.put(None)
+
+    def read_results(self):
+        """Hand the messages of the worker processes over to the event loop"""
+        while True:
+            message = self.result_queue.get()
+            if message is None:
+                break
+            self.loop.call_soon_threadsafe(self.handle_result, *message)
+
+    def submit(self, user: str, text: str, preferences: Optional[str] = None) -> Job:
+        """Queue a job, raises QueueFullError when the queue or the user's share of it is full"""
+        if self.queued >= self.max_queue:
+            raise QueueFullError("Job queue is full")
+        user_queue = self.queues.get(user)
+        if user_queue is not None and len(user_queue) >= self.max_per_user:
+            raise QueueFullError(f"Too many queued jobs for user {user}")
+
+        job = Job(user, text, preferences)
+        self.jobs[job.id] = job
+        self.queues.setdefault(user, deque()).append(job)
+        self.queued += 1
+        self.dispatch()
+        return job
+
+    def next_job(self) -> Optional[Job]:
+        """Take the next job from the user whose turn it is"""
+        if not self.queues:
+            return None
+        user, user_queue = self.queues.popitem(last=False)
+        job = user_queue.popleft()
+        if user_queue:
+            # Back to the end of the line
+            self.queues[user] = user_queue
+        self.queued -= 1
+        return job
+
+    def dispatch(self):
+        while self.idle and self.queues:
+            worker_id = self.idle.popleft()
+            job = self.next_job()
+            job.status = "running"
+            job.worker = worker_id
+            job.started_at = time.time()
+            self.running[worker_id] = job
+            self.workers[worker_id][1].put((job.id, job.text, job.preferences))
+
+    def finish(self, job: Job, status: str, result: Any = None, error: Optional[str] = None, stats: Optional[Dict[str, Any]] = None):
+        job.status = status
+        job.result = result
+        job.error = error
+        job.stats = stats
+        job.finished_at = time.time()
+        job.done.set()
+
+        # Forget the oldest finished jobs
+        self.finished.append(job.id)
+        while len(self.finished) > self.max_finished:
+            self.jobs.pop(self.finished.popleft(), None)
+
+    def handle_result(self, kind: str, worker_id: int, job_id: Optional[str], payload: Any, stats: Optional[Dict[str, Any]]):
+        if kind == "ready":
+            logger.info(f"Worker {worker_id} ready")
+        else:
+            job = self.running.pop(worker_id, None)
+            if job is not None and job.id == job_id:
+                if kind == "done":
+                    self.finish(job, "done", result=payload, stats=stats)
+                else:
+                    self.finish(job, "failed", error=payload, stats=stats)
+        self.idle.append(worker_id)
+        self.dispatch()
+
+    async def monitor(self, interval: float = 1.0):
+        """Restart crashed workers and fail the job they were running"""
+        while True:
+            await asyncio.sleep(interval)
+            for worker_id, (process, _) in list(self.workers.items()):
+                if process.is_alive():
+                    continue
+                logger.error(f"Worker {worker_id} exited with code {process.exitcode}, restarting")
+                if worker_id in self.idle:
+                    self.idle.remove(worker_id)
+                job = self.running.pop(worker_id, None)
+                if job is not None:
+                    self.finish(job, "failed", error="Worker crashed")
+                self.start_worker(worker_id)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self.workers),
+            "idle": len(self.idle),
+            "running": len(self.running),
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "queued_per_user": {user: len(user_queue) for user, user_queue in self.queues.items()}
+        }
+
+def create_app(service: JobService) -> Starlette:
+    """Create the HTTP API of the job service"""
+
+    async def submit_job(request: Request):
+        body = await request.json()
+        if not body.get("text"):
+            return JSONResponse({"error": "No text provided"}, status_code=400)
+        try:
+            job = service.submit(body.get("user") or "anonymous", body["text"], body.get("preferences"))
+        except QueueFullError as e:
+            return JSONResponse({"error": str(e)}, status_code=429, headers={"Retry-After": "1"})
+        return JSONResponse({"id": job.id, "status": job.status}, status_code=202)
+
+    async def get_job(request: Request):
+        job = service.jobs.get(request.path_params["id"])
+        if job is None:
+            return JSONResponse({"error": "Job not found"}, status_code=404)
+        return JSONResponse(job.to_dict())
+
+    async def get_result(request: Request):
+        """Return the job result, waiting up to ?wait= seconds for it to finish"""
+        job = service.jobs.get(request.path_params["id"])
+        if job is None:
+            return JSONResponse({"error": "Job not found"}, status_code=404)
+        wait = min(float(request.query_params.get("wait", 0)), 60.0)
+        if wait > 0 and not job.done.is_set():
+            try:
+                await asyncio.wait_for(job.done.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+        if not job.done.is_set():
+            return JSONResponse({"id": job.id, "status": job.status}, status_code=202)
+        return JSONResponse({"id": job.id, "status": job.status, "result": job.result, "error": job.error})
+
+    async def status(request: Request):
+        return JSONResponse(service.status())
+
+    @asynccontextmanager
+    async def lifespan(app):
+        service.start()
+        monitor = asyncio.create_task(service.monitor())
+        yield
+        monitor.cancel()
+        service.stop()
+
+    return Starlette(
+        routes=[
+            Route("/jobs", submit_job, methods=["POST"]),
+            Route("/jobs", status, methods=["GET"]),
+            Route("/jobs/{id}", get_job, methods=["GET"]),
+            Route("/jobs/{id}/result", get_result, methods=["GET"]),
+        ],
+        lifespan=lifespan
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agent job service with warm worker processes")
+    parser.add_argument("--port", type=int, default=int(os.environ.get('JOB_SERVICE_PORT', 3002)))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--max-per-user", type=int, default=16)
+    parser.add_argument("--simulate", type=float, default=None, help="Sleep this many seconds per job instead of running the agent")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    service = JobService(args.workers, args.max_queue, args.max_per_user, simulate=args.simulate)
+    uvicorn.run(create_app(service), host="localhost", port=args.port, log_level="warning")
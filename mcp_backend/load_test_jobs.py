@@ -0,0 +1,80 @@
+import sys
+import time
+import argparse
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def submitter(url: str, user: str, deadline: float, latencies: list, rejected: list, failed: list, lock: threading.Lock):
+    """Submit jobs one after another until the deadline, waiting for each result"""
+    session = requests.Session()
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = session.post(f"{url}/jobs", json={"user": user, "text": "load test"})
+        if response.status_code == 429:
+            with lock:
+                rejected.append(1)
+            time.sleep(float(response.headers.get("Retry-After", 1)) / 10)
+            continue
+        response.raise_for_status()
+        job_id = response.json()["id"]
+
+        # 202 means the job is still running, anything else but 200 means its result is gone
+        result = session.get(f"{url}/jobs/{job_id}/result", params={"wait": 30})
+        while result.status_code == 202:
+            result = session.get(f"{url}/jobs/{job_id}/result", params={"wait": 30})
+        with lock:
+            if result.status_code == 200 and result.json()["status"] == "done":
+                latencies.append(time.perf_counter() - start)
+            else:
+                failed.append(result.status_code)
+
+def run_level(url: str, concurrency: int, duration: float, users: int) -> dict:
+    latencies, rejected, failed, lock = [], [], [], threading.Lock()
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(submitter, url, f"user{i % users}", deadline, latencies, rejected, failed, lock)
+            for i in range(concurrency)
+        ]
+        # Raise the errors of the submitters instead of losing them
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "completed": len(latencies),
+        "rejected": len(rejected),
+        "failed": len(failed),
+        "throughput": len(latencies) / elapsed,
+        "p50": percentile(latencies, 0.50) if latencies else 0.0,
+        "p95": percentile(latencies, 0.95) if latencies else 0.0,
+        "p99": percentile(latencies, 0.99) if latencies else 0.0,
+        "mean": statistics.mean(latencies) if latencies else 0.0
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the job service, start it first with: python job_service.py --simulate 0.5")
+    parser.add_argument("--url", default="http://localhost:3002")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per concurrency level")
+    parser.add_argument("--users", type=int, default=8, help="Distinct users the submitters are spread over")
+    parser.add_argument("--levels", default="1,2,4,8,16,32,64")
+    args = parser.parse_args()
+
+    try:
+        print(f"Job service status: {requests.get(f'{args.url}/jobs').json()}")
+    except requests.ConnectionError:
+        print(f"Job service not running at {args.url}")
+        sys.exit(1)
+
+    print(f"\n{'submitters':>10} {'completed':>9} {'rejected':>8} {'failed':>6} {'jobs/s':>7} {'p50':>7} {'p95':>7} {'p99':>7}")
+    for level in [int(level) for level in args.levels.split(",")]:
+        stats = run_level(args.url, level, args.duration, args.users)
+        print(f"{stats['concurrency']:>10} {stats['completed']:>9} {stats['rejected']:>8} {stats['failed']:>6} {stats['throughput']:>7.2f} "
+              f"{stats['p50']:>6.2f}s {stats['p95']:>6.2f}s {stats['p99']:>6.2f}s")
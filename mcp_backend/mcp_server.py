@@ -5,11 +5,16 @@ from mcp.types import TextContent
 from mcp import types
 import sys
 import time
+import asyncio
+import threading
 import subprocess
 import os
+import json
 import requests
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from model import *
+from schedule_index import ScheduleIndex, Interval, parse_date, parse_time
+from preferences import preference_store
 import logging
 
 # Configure logger
@@ -18,6 +23,109 @@ logger = logging.getLogger(__name__)
 # instantiate an MCP server client
 mcp = FastMCP("NoteTaker")
 
+# HTTP session used by the tools to talk to the NoteTaker server
+http = requests.Session()
+
+# Write the timing of every HTTP call when the agent records a session cassette
+http_log_path = os.environ.get("CASSETTE_HTTP_LOG")
+if http_log_path:
+    def log_http_timing(response, *args, **kwargs):
+        with open(http_log_path, "a") as f:
+            f.write(json.dumps({
+                "method": response.request.method,
+                "url": response.url,
+                "status": response.status_code,
+                "duration": response.elapsed.total_seconds()
+            }) + "\n")
+
+    http.hooks["response"].append(log_http_timing)
+
+async def http_request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Run a blocking HTTP call in a worker thread. FastMCP runs sync tools on its event loop,
+    async tools let the independent steps of a plan reach the NoteTaker server in parallel.
+    """
+    return await asyncio.to_thread(http.request, method, url, **kwargs)
+
+# Interval index over timed events, blockers and reminders used by the scheduling tools
+schedule_index = ScheduleIndex()
+# Full reloads catch changes missed while the note stream was down, refreshes in between only fetch updated notes
+SCHEDULE_INDEX_RELOAD_SECONDS = 300
+schedule_index_loaded_at = None
+schedule_index_synced_at = None
+# Concurrent scheduling tools would otherwise clear and fill the index at the same time
+schedule_index_lock = asyncio.Lock()
+# Notes deleted while a refresh is fetching, the fetched notes may still hold them
+schedule_index_deleted = set()
+# Bumped when the note stream (re)connects, a full reload fetched before that may have missed deletions
+schedule_index_reload_requests = 0
+note_stream_thread = None
+
+def remove_deleted_note(note_id: str):
+    """Remove a note deleted on the NoteTaker server from the schedule index, runs on the event loop"""
+    schedule_index.remove(note_id)
+    if schedule_index_lock.locked():
+        schedule_index_deleted.add(note_id)
+
+def reload_schedule_index():
+    """Make the next refresh a full reload, runs on the event loop"""
+    global schedule_index_loaded_at, schedule_index_reload_requests
+    schedule_index_loaded_at = None
+    schedule_index_reload_requests += 1
+
+def watch_note_deletions(loop: asyncio.AbstractEventLoop):
+    """
+    Follow the note stream of the NoteTaker server and remove deleted notes from the schedule index.
+    Updated notes carry a new updatedAt and are fetched by the refreshes, deleted notes would
+    stay in the index until the next full reload. Every (re)connect triggers a full reload,
+    deletions may have been missed while the stream was down.
+    """
+    while True:
+        try:
+            with requests.get("http://localhost:3000/api/notes/stream", stream=True, timeout=(5, 60)) as response:
+                response.raise_for_status()
+                loop.call_soon_threadsafe(reload_schedule_index)
+                event = None
+                for line in response.iter_lines(decode_unicode=True):
+                    if line.startswith("event:"):
+                        event = line[len("event:"):].strip()
+                    elif line.startswith("data:") and event == "noteDeleted":
+                        loop.call_soon_threadsafe(remove_deleted_note, json.loads(line[len("data:"):])["id"])
+                    elif not line:
+                        event = None
+        except (requests.RequestException, ValueError, KeyError) as e:
+            logger.warning(f"Note stream unavailable, deleted notes are dropped from the schedule index on full reloads: {e}")
+        loop.call_soon_threadsafe(reload_schedule_index)
+        time.sleep(5)
+
+async def refresh_schedule_index():
+    """Bring the schedule index up to date with the NoteTaker server"""
+    global schedule_index_loaded_at, schedule_index_synced_at, note_stream_thread
+    if note_stream_thread is None:
+        note_stream_thread = threading.Thread(target=watch_note_deletions, args=(asyncio.get_running_loop(),), daemon=True)
+        note_stream_thread.start()
+
+    async with schedule_index_lock:
+        now = datetime.now(timezone.utc)
+        params = {}
+        full_reload = schedule_index_loaded_at is None or (now - schedule_index_loaded_at).total_seconds() > SCHEDULE_INDEX_RELOAD_SECONDS
+        if not full_reload:
+            params["updatedSince"] = schedule_index_synced_at
+        reload_requests = schedule_index_reload_requests
+
+        response = await http_request("GET", "http://localhost:3000/api/notes", params=params)
+        # Change the index only once the notes arrived, tools running meanwhile still see a full index
+        if full_reload:
+            schedule_index.clear()
+            if reload_requests == schedule_index_reload_requests:
+                schedule_index_loaded_at = now
+        for note in response.json():
+            schedule_index.add(note)
+        for note_id in schedule_index_deleted:
+            schedule_index.remove(note_id)
+        schedule_index_deleted.clear()
+        schedule_index_synced_at = now.isoformat()
+
 # DEFINE TOOLS
 
 #get current time
@@ -46,101 +154,152 @@ def get_day_of_week(date: str) -> GetDayOfWeekOutput:
 
 # Get all todos given a date
 @mcp.tool()
-def list_todos(input: ListTodosInput) -> ListTodosOutput:
+async def list_todos(input: ListTodosInput) -> ListTodosOutput:
     """List all todos for a given date in YYYY-MM-DD format"""
     logger.info("CALLED: list_todos(date: str) -> list[dict]:")
-    response = requests.get(f"http://localhost:3000/api/todos/date/{input.date}")
+    response = await http_request("GET", f"http://localhost:3000/api/todos/date/{input.date}")
     return ListTodosOutput(result=response.json())
 
 # Create a todo given a date and content
 @mcp.tool()
-def create_todo(input: CreateTodoInput) -> CreateTodoOutput:
+async def create_todo(input: CreateTodoInput) -> CreateTodoOutput:
     """Create a todo given a date and content"""
     logger.info("CALLED: create_todo(date: str, content: str) -> dict:")
-    response = requests.post(f"http://localhost:3000/api/todos/date/{input.date}", json={"content": input.content})
+    response = await http_request("POST", f"http://localhost:3000/api/todos/date/{input.date}", json={"content": input.content})
     return CreateTodoOutput(result=f"Todo created successfully with id: {response.json()['id']}")
 
 # change todo status to completed given a unique id
 @mcp.tool()
-def complete_todo(input: CompleteTodoInput) -> CompleteTodoOutput:
+async def complete_todo(input: CompleteTodoInput) -> CompleteTodoOutput:
     """Change todo status to completed given a unique id"""
     logger.info("CALLED: complete_todo(id: str) -> dict:")
-    response = requests.put(f"http://localhost:3000/api/todos/{input.id}/toggle")
+    response = await http_request("PUT", f"http://localhost:3000/api/todos/{input.id}/toggle")
     return CompleteTodoOutput(result="Todo status updated successfully to completed")
 
 # change todo status to uncompleted given a unique id
 @mcp.tool()
-def uncomplete_todo(input: UncompleteTodoInput) -> UncompleteTodoOutput:
+async def uncomplete_todo(input: UncompleteTodoInput) -> UncompleteTodoOutput:
     """Change todo status to uncompleted given a unique id"""
     logger.info("CALLED: uncomplete_todo(id: str) -> dict:")
-    response = requests.put(f"http://localhost:3000/api/todos/{input.id}/toggle")
+    response = await http_request("PUT", f"http://localhost:3000/api/todos/{input.id}/toggle")
     return UncompleteTodoOutput(result="Todo status updated successfully to uncompleted")
 
 # Delete a todo given a unique id
 @mcp.tool()
-def delete_todo(input: DeleteTodoInput) -> DeleteTodoOutput:
+async def delete_todo(input: DeleteTodoInput) -> DeleteTodoOutput:
     """Delete a todo given a unique id"""
     logger.info("CALLED: delete_todo(id: str) -> dict:")
-    response = requests.delete(f"http://localhost:3000/api/todos/{input.id}")
+    response = await http_request("DELETE", f"http://localhost:3000/api/todos/{input.id}")
     return DeleteTodoOutput(result="Todo deleted successfully")
 
 # Delete all todos given a date (dummy tool)
 #@mcp.tool()
-def delete_todos(date: str) -> dict:
+async def delete_todos(date: str) -> dict:
     """Delete all todos given a date"""
     logger.info("CALLED: delete_todos(date: str) -> dict:")
-    response = requests.delete(f"http://localhost:3000/api/todos/date/{date}")
+    response = await http_request("DELETE", f"http://localhost:3000/api/todos/date/{date}")
     return f"All todos deleted successfully"
 
 # List all events given a date
 @mcp.tool()
-def list_events(input: ListEventsInput) -> ListEventsOutput:
+async def list_events(input: ListEventsInput) -> ListEventsOutput:
     """List all events given a date"""
     logger.info("CALLED: list_events(date: str) -> list[dict]:")
-    response = requests.get(f"http://localhost:3000/api/events/date/{input.date}")
+    response = await http_request("GET", f"http://localhost:3000/api/events/date/{input.date}")
     return ListEventsOutput(result=response.json())
 
-# Create an event given a date and content
+# Create an event given a date, content and optionally its start and end time
 @mcp.tool()
-def create_event(input: CreateEventInput) -> CreateEventOutput:
-    """Create an event given a date and content"""
-    logger.info("CALLED: create_event(date: str, content: str) -> dict:")
-    response = requests.post(f"http://localhost:3000/api/events/date/{input.date}", json={"content": input.content})
+async def create_event(input: CreateEventInput) -> CreateEventOutput:
+    """Create an event given a date in YYYY-MM-DD format and content, with start_time and end_time in HH:MM 24-hour format when the event has a time"""
+    logger.info("CALLED: create_event(date: str, content: str, start_time: str, end_time: str) -> dict:")
+    event = {"content": input.content}
+    if input.start_time and input.end_time:
+        event.update({"startTime": input.start_time, "endTime": input.end_time})
+    response = await http_request("POST", f"http://localhost:3000/api/events/date/{input.date}", json=event)
+    schedule_index.add(response.json())
     return CreateEventOutput(result=f"Event created successfully with id: {response.json()['id']}")
 
 # Delete an event given a unique id
 @mcp.tool()
-def delete_event(input: DeleteEventInput) -> DeleteEventOutput:
+async def delete_event(input: DeleteEventInput) -> DeleteEventOutput:
     """Delete an event given a unique id"""
     logger.info("CALLED: delete_event(id: str) -> dict:")
-    response = requests.delete(f"http://localhost:3000/api/events/{input.id}")
+    response = await http_request("DELETE", f"http://localhost:3000/api/events/{input.id}")
+    schedule_index.remove(input.id)
     return DeleteEventOutput(result="Event deleted successfully")
 
 # List reminders given a date
 @mcp.tool()
-def list_reminders(input: ListRemindersInput) -> ListRemindersOutput:
+async def list_reminders(input: ListRemindersInput) -> ListRemindersOutput:
     """List reminders given a date"""
     logger.info("CALLED: list_reminders(date: str) -> list[dict]:")
-    response = requests.get(f"http://localhost:3000/api/reminders/date/{input.date}")
+    response = await http_request("GET", f"http://localhost:3000/api/reminders/date/{input.date}")
     return ListRemindersOutput(result=response.json())
 
 # Create a reminder given a date in YYYY-MM-DD format and time in HH:MM 24-hour format and content
 @mcp.tool()
-def create_reminder(input: CreateReminderInput) -> CreateReminderOutput:
+async def create_reminder(input: CreateReminderInput) -> CreateReminderOutput:
     """Create a reminder for a given date in YYYY-MM-DD format and at a given time in HH:MM 24-hour format and content"""
     logger.info("CALLED: create_reminder(date: str, time: str, content: str) -> dict:")
-    response = requests.post(f"http://localhost:3000/api/reminders/date/{input.date}", 
+    response = await http_request("POST", f"http://localhost:3000/api/reminders/date/{input.date}", 
                            json={"content": input.content, "time": input.time})
+    schedule_index.add(response.json())
     return CreateReminderOutput(result=f"Reminder created successfully with id: {response.json()['id']}")
 
 # Delete a reminder given a unique id
 @mcp.tool()
-def delete_reminder(input: DeleteReminderInput) -> DeleteReminderOutput:
+async def delete_reminder(input: DeleteReminderInput) -> DeleteReminderOutput:
     """Delete a reminder given a unique id"""
     logger.info("CALLED: delete_reminder(id: str) -> dict:")
-    response = requests.delete(f"http://localhost:3000/api/reminders/{input.id}")
+    response = await http_request("DELETE", f"http://localhost:3000/api/reminders/{input.id}")
+    schedule_index.remove(input.id)
     return DeleteReminderOutput(result="Reminder deleted successfully")
 
+# Find free time slots of a given duration between two dates
+@mcp.tool()
+async def find_free_slots(input: FindFreeSlotsInput) -> FindFreeSlotsOutput:
+    """Find free time slots of duration_minutes between start_date and end_date in YYYY-MM-DD format, within working hours work_start to work_end in HH:MM 24-hour format, keeping buffer_minutes free around timed events, blockers, reminders and focus blocks. Working hours and buffer default to the user preferences. Events without a time are listed in untimed_events"""
+    logger.info("CALLED: find_free_slots(start_date: str, end_date: str, duration_minutes: int, work_start: str, work_end: str, buffer_minutes: int) -> list[dict]:")
+    await refresh_schedule_index()
+    preferences = preference_store.get()
+    start_date, end_date = parse_date(input.start_date), parse_date(input.end_date)
+    # Slots are reported in whole minutes, so they must not start before the next one
+    now = datetime.now()
+    not_before = now.replace(second=0, microsecond=0)
+    if not_before < now:
+        not_before += timedelta(minutes=1)
+    slots = schedule_index.free_slots(
+        start_date,
+        end_date,
+        input.duration_minutes,
+        input.work_start or preferences.work_start,
+        input.work_end or preferences.work_end,
+        input.buffer_minutes if input.buffer_minutes is not None else preferences.buffer_minutes,
+        not_before=not_before,
+        extra_busy=preferences.focus_intervals(start_date, end_date)
+    )
+    return FindFreeSlotsOutput(result=slots, untimed_events=schedule_index.untimed_events(start_date, end_date))
+
+# Check a proposed time for conflicts with events, blockers and reminders
+@mcp.tool()
+async def check_conflicts(input: CheckConflictsInput) -> CheckConflictsOutput:
+    """List the timed events, blockers, reminders and focus blocks conflicting with a proposed time on a date in YYYY-MM-DD format from start_time to end_time in HH:MM 24-hour format, including buffer_minutes around it. Buffer defaults to the user preferences. Events without a time on the date are listed in untimed_events"""
+    logger.info("CALLED: check_conflicts(date: str, start_time: str, end_time: str, buffer_minutes: int) -> list[dict]:")
+    await refresh_schedule_index()
+    preferences = preference_store.get()
+    day = parse_date(input.date)
+    start, end = parse_time(day, input.start_time), parse_time(day, input.end_time)
+    buffer_minutes = input.buffer_minutes if input.buffer_minutes is not None else preferences.buffer_minutes
+    conflicts = [interval.to_dict() for interval in schedule_index.conflicts(start, end, buffer_minutes)]
+
+    # Focus blocks from the user preferences are busy time as well
+    buffer = timedelta(minutes=buffer_minutes)
+    for focus_start, focus_end in preferences.focus_intervals(day, day):
+        if focus_start < end + buffer and focus_end > start - buffer:
+            conflicts.append(Interval("focus", "focus", "Focus block", focus_start, focus_end).to_dict())
+    return CheckConflictsOutput(result=conflicts, untimed_events=schedule_index.untimed_events(day, day))
+
 # DEFINE RESOURCES
 
 # Add a dynamic greeting resource
@@ -63,6 +63,9 @@ class ListEventsOutput(BaseModel):
 class CreateEventInput(BaseModel):
     date: str
     content: str
+    # Events without a time are not treated as busy by the scheduling tools
+    start_time: Optional[str] = None
+    end_time: Optional[str] = None
 
 class CreateEventOutput(BaseModel):
     result: str
@@ -94,6 +97,32 @@ class DeleteReminderInput(BaseModel):
 class DeleteReminderOutput(BaseModel):
     result: str
 
+# Scheduling Models
+class FindFreeSlotsInput(BaseModel):
+    start_date: str
+    end_date: str
+    duration_minutes: int
+    # Unset fields fall back to the user preferences
+    work_start: Optional[str] = None
+    work_end: Optional[str] = None
+    buffer_minutes: Optional[int] = None
+
+class FindFreeSlotsOutput(BaseModel):
+    result: List[Dict]
+    # Events without a time in the date range, the slots do not account for them
+    untimed_events: List[Dict] = []
+
+class CheckConflictsInput(BaseModel):
+    date: str
+    start_time: str
+    end_time: str
+    buffer_minutes: Optional[int] = None
+
+class CheckConflictsOutput(BaseModel):
+    result: List[Dict]
+    # Events without a time on the date, they may or may not conflict
+    untimed_events: List[Dict] = []
+
 # Greeting Model
 class GetGreetingInput(BaseModel):
     name: str
@@ -1,48 +1,177 @@
+import re
 import json
-from typing import Dict, Any
+import time
+from typing import Dict, Any, Optional
 from google import genai
+from google.genai import types
 import asyncio
+from cassette import active_cassette
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# How the LLM responses of this process were parsed
+parse_stats = {"responses": 0, "clean": 0, "repaired": 0, "failed": 0, "retries": 0}
+
+CODE_FENCE_PATTERN = re.compile(r"^\s*```[a-zA-Z]*\s*|\s*```\s*$")
+PYTHON_LITERAL_PATTERN = re.compile(r"\b(True|False|None)\b")
+PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+
+def loads(text: str) -> Any:
+    """Decode JSON with orjson when it is installed"""
+    return orjson.loads(text) if orjson is not None else json.loads(text)
 
 def clean_code_block(text: str) -> str:
     """Clean JSON code block from LLM response"""
-    if text.startswith("```json"):
-        text = text[len("```json"):]
-    if text.endswith("```"):
-        text = text[:-3]
-    return text.strip()
-
-async def generate_with_timeout(client: genai.Client, prompt: str, timeout: int = 10) -> str:
-    """Generate content with a timeout"""
+    return CODE_FENCE_PATTERN.sub("", text).strip()
+
+def extract_json_object(text: str) -> str:
+    """Cut the first JSON object out of text, closing its open strings, arrays and objects if the response was truncated"""
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("No JSON object in LLM response")
+
+    closers = {"{": "}", "[": "]"}
+    # Closers of the open objects and arrays, innermost last
+    stack = []
+    quote = None
+    i = start
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            if ch == "\\":
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif ch in closers:
+            stack.append(closers[ch])
+        elif ch in "}]" and stack and ch == stack[-1]:
+            stack.pop()
+            if not stack:
+                return text[start:i + 1]
+        i += 1
+    return text[start:] + (quote or "") + "".join(reversed(stack))
+
+def repair_json(text: str) -> str:
+    """
+    Repair the usual ways an LLM breaks JSON: prose or code fences around the object,
+    single or smart quotes, Python literals, raw new lines in strings, trailing commas
+    and truncated output.
+    """
+    text = extract_json_object(clean_code_block(text).translate(SMART_QUOTES))
+    out = []
+    quote = None
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            if ch == "\\" and i + 1 < len(text):
+                # \' is not a valid JSON escape
+                out.append("'" if text[i + 1] == "'" else text[i:i + 2])
+                i += 2
+                continue
+            if ch == quote:
+                out.append('"')
+                quote = None
+            elif ch == '"':
+                out.append('\\"')
+            elif ch == "\n":
+                out.append("\\n")
+            elif ch == "\t":
+                out.append("\\t")
+            else:
+                out.append(ch)
+        elif ch in "\"'":
+            out.append('"')
+            quote = ch
+        elif ch in "}]":
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            out.append(ch)
+        else:
+            match = PYTHON_LITERAL_PATTERN.match(text, i)
+            if match:
+                out.append(PYTHON_LITERALS[match.group(0)])
+                i = match.end()
+                continue
+            out.append(ch)
+        i += 1
+    return "".join(out)
+
+def parse_json_response(text: str) -> Dict[str, Any]:
+    """Parse an LLM response as a JSON object, repairing it locally when it is malformed"""
+    parse_stats["responses"] += 1
+    try:
+        result = loads(clean_code_block(text))
+        if isinstance(result, dict):
+            parse_stats["clean"] += 1
+            return result
+    except ValueError:
+        pass
+
+    try:
+        result = loads(repair_json(text))
+    except ValueError as e:
+        parse_stats["failed"] += 1
+        raise ValueError(f"Malformed JSON in LLM response: {e}")
+    if not isinstance(result, dict):
+        parse_stats["failed"] += 1
+        raise ValueError("LLM response is not a JSON object")
+    parse_stats["repaired"] += 1
+    return result
+
+async def generate_with_timeout(client: genai.Client, prompt: str, timeout: int = 10, response_schema: Optional[Dict[str, Any]] = None) -> str:
+    """Generate content with a timeout, constrained to JSON matching response_schema if given"""
     print("Starting LLM generation...")
+    cassette = active_cassette.get()
+    if cassette is not None and cassette.replaying:
+        return await cassette.replay_llm(prompt)
+
+    config = None
+    if response_schema is not None:
+        config = types.GenerateContentConfig(response_mime_type="application/json", response_schema=response_schema)
+
+    start_time = time.perf_counter()
     try:
         loop = asyncio.get_event_loop()
         response = await asyncio.wait_for(
             loop.run_in_executor(
-                None, 
+                None,
                 lambda: client.models.generate_content(
                     model="gemini-2.0-flash",
-                    contents=prompt
+                    contents=prompt,
+                    config=config
                 )
             ),
             timeout=timeout
         )
         print("LLM generation completed")
+        if cassette is not None:
+            cassette.record_llm(prompt, response.text.strip(), time.perf_counter() - start_time)
         return response.text.strip()
     except Exception as e:
         print(f"Error in LLM generation: {e}")
+        if cassette is not None:
+            cassette.record_llm(prompt, None, time.perf_counter() - start_time, str(e) or type(e).__name__)
         raise
 
-async def perceive_input(client: genai.Client, user_input: str, system_prompt: str) -> Dict[str, Any]:
+async def perceive_input(client: genai.Client, user_input: str, system_prompt: str, response_schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Process user input and extract key information using LLM
     Returns a structured perception result
     """
     try:
         prompt = f"{system_prompt}\n\nQuery: {user_input}"
-        response_text = await generate_with_timeout(client, prompt)
-        response_text = clean_code_block(response_text)
+        response_text = await generate_with_timeout(client, prompt, response_schema=response_schema)
         print(f"INFO: perception response: {response_text}")
-        return json.loads(response_text)
+        return parse_json_response(response_text)
     except Exception as e:
         print(f"Error in perception: {e}")
-        raise 
\ No newline at end of file
+        raise
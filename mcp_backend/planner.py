@@ -0,0 +1,243 @@
+import re
+import json
+import asyncio
+from typing import Dict, Any, List, Optional
+from google import genai
+from mcp import ClientSession
+from perception import perceive_input
+from action import execute_tool_call
+from system_prompt_template import planner_system_prompt, repair_system_prompt, final_answer_system_prompt
+import logging
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Matches {{s1}}, {{s1.id}} and {{s1.result}} placeholders in step parameters
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*(\w+)(?:\.(\w+))?\s*\}\}")
+# Matches the id in tool results like "Todo created successfully with id: abc123"
+ID_PATTERN = re.compile(r"\bid:\s*([A-Za-z0-9_-]+)")
+
+class PlanError(Exception):
+    """Raised when the plan returned by the LLM is not a valid DAG of tool steps"""
+
+class PlanStep:
+    def __init__(self, step_id: str, function_name: str, parameters: Dict[str, Any], depends_on: List[str] = None):
+        self.id = step_id
+        self.function_name = function_name
+        self.parameters = parameters or {}
+        self.depends_on = set(depends_on or [])
+        # Dependencies referenced through placeholders are implicit dependencies
+        self.depends_on.update(find_placeholder_steps(self.parameters))
+        self.status = "pending"
+        self.result = None
+        self.error = None
+
+    def describe(self) -> str:
+        if self.status == "done":
+            return f"Step {self.id} called {self.function_name} with {self.parameters} and returned {self.result}."
+        return f"Step {self.id} calling {self.function_name} with {self.parameters} {self.status}: {self.error}."
+
+def find_placeholder_steps(value: Any) -> List[str]:
+    """Return the ids of all steps referenced by placeholders in a parameter value"""
+    if isinstance(value, str):
+        return [match.group(1) for match in PLACEHOLDER_PATTERN.finditer(value)]
+    if isinstance(value, dict):
+        return [step_id for item in value.values() for step_id in find_placeholder_steps(item)]
+    if isinstance(value, list):
+        return [step_id for item in value for step_id in find_placeholder_steps(item)]
+    return []
+
+def extract_field(output: Any, field: Optional[str]) -> Any:
+    """Extract a field from the output of a tool call"""
+    if field is None:
+        return output
+
+    parsed = output
+    if isinstance(output, str):
+        try:
+            parsed = json.loads(output)
+        except ValueError:
+            parsed = output
+
+    if isinstance(parsed, dict) and field in parsed:
+        return parsed[field]
+
+    if field == "id":
+        text = parsed.get("result", output) if isinstance(parsed, dict) else output
+        match = ID_PATTERN.search(str(text))
+        if match:
+            return match.group(1)
+
+    raise ValueError(f"Field '{field}' not found in output: {output}")
+
+def substitute_placeholders(value: Any, steps: Dict[str, PlanStep]) -> Any:
+    """Replace the placeholders in a parameter value with the outputs of completed steps"""
+    if isinstance(value, dict):
+        return {key: substitute_placeholders(item, steps) for key, item in value.items()}
+    if isinstance(value, list):
+        return [substitute_placeholders(item, steps) for item in value]
+    if not isinstance(value, str):
+        return value
+
+    # A value that is a single placeholder keeps the type of the referenced output
+    match = PLACEHOLDER_PATTERN.fullmatch(value.strip())
+    if match:
+        return extract_field(steps[match.group(1)].result, match.group(2))
+    return PLACEHOLDER_PATTERN.sub(
+        lambda m: str(extract_field(steps[m.group(1)].result, m.group(2))), value
+    )
+
+def find_cycle(steps: Dict[str, PlanStep]) -> Optional[List[str]]:
+    """Return the ids of the steps left on a dependency cycle, None if the steps form a DAG"""
+    remaining = {step_id: set(step.depends_on) for step_id, step in steps.items()}
+    while remaining:
+        ready = [step_id for step_id, depends_on in remaining.items() if not depends_on & remaining.keys()]
+        if not ready:
+            return sorted(remaining)
+        for step_id in ready:
+            del remaining[step_id]
+    return None
+
+def parse_plan(plan: Dict[str, Any]) -> Dict[str, PlanStep]:
+    """Validate the plan returned by the LLM and build its steps, raises PlanError for any malformed plan"""
+    if not isinstance(plan, dict) or not isinstance(plan.get("steps"), list):
+        raise PlanError("Invalid plan structure from LLM")
+
+    steps = {}
+    for i, raw_step in enumerate(plan["steps"]):
+        if not isinstance(raw_step, dict):
+            raise PlanError(f"Step {i + 1} is not an object: {raw_step}")
+        step_id = str(raw_step.get("id") or f"s{i + 1}")
+        if step_id in steps:
+            raise PlanError(f"Duplicate step id: {step_id}")
+        if not raw_step.get("function_name") or not isinstance(raw_step["function_name"], str):
+            raise PlanError(f"Step {step_id} has no function_name")
+        parameters = raw_step.get("parameters") or {}
+        if not isinstance(parameters, dict):
+            raise PlanError(f"Step {step_id} parameters are not an object: {parameters}")
+        depends_on = raw_step.get("depends_on") or []
+        if not isinstance(depends_on, list) or not all(isinstance(dep, (str, int)) for dep in depends_on):
+            raise PlanError(f"Step {step_id} depends_on is not a list of step ids: {depends_on}")
+        steps[step_id] = PlanStep(step_id, raw_step["function_name"], parameters, [str(dep) for dep in depends_on])
+
+    for step in steps.values():
+        unknown = step.depends_on - steps.keys()
+        if unknown:
+            raise PlanError(f"Step {step.id} depends on unknown steps: {sorted(unknown)}")
+    cycle = find_cycle(steps)
+    if cycle:
+        raise PlanError(f"Plan has a dependency cycle between steps: {cycle}")
+    return steps
+
+async def make_plan(
+    client: genai.Client,
+    user_prompt: str,
+    tools_description: str,
+    user_preferences: str
+) -> Dict[str, Any]:
+    """Ask the LLM for the full plan of tool steps in a single call"""
+    try:
+        prompt = planner_system_prompt.replace("_user_preferences_", user_preferences)
+        return await perceive_input(client, user_prompt, prompt.replace("_tools_description_", tools_description))
+    except ValueError as e:
+        # The response could not be parsed as a plan
+        logger.error(f"Error in planning: {e}")
+        raise PlanError(f"Malformed plan from LLM: {e}") from e
+    except Exception as e:
+        logger.error(f"Error in planning: {e}")
+        raise
+
+async def repair_step(
+    client: genai.Client,
+    step: PlanStep,
+    steps: Dict[str, PlanStep],
+    tools_description: str
+) -> Dict[str, Any]:
+    """Ask the LLM for a corrected version of a failed step"""
+    completed = "\n".join(s.describe() for s in steps.values() if s.status == "done")
+    query = (
+        f"Failed step: {step.function_name} with {step.parameters}\n"
+        f"Error: {step.error}\n\n"
+        f"Completed steps:\n{completed or 'none'}"
+    )
+    return await perceive_input(client, query, repair_system_prompt.replace("_tools_description_", tools_description))
+
+async def compose_final_answer(client: genai.Client, user_prompt: str, steps: Dict[str, PlanStep]) -> str:
+    """Ask the LLM to phrase the final answer from the executed steps"""
+    executed = "\n".join(step.describe() for step in steps.values())
+    query = f"{user_prompt}\n\nExecuted steps:\n{executed}"
+    answer = await perceive_input(client, query, final_answer_system_prompt)
+    return answer.get("your_comment", "")
+
+class PlanExecutor:
+    """
+    Execute a plan of tool steps as a DAG.
+    Steps whose dependencies are done run concurrently, failed steps are
+    repaired through the LLM at most max_repairs times.
+    """
+    def __init__(self, client: genai.Client, session: ClientSession, tools: List[Any], tools_description: str, max_repairs: int = 1):
+        self.client = client
+        self.session = session
+        self.tools = tools
+        self.tools_description = tools_description
+        self.max_repairs = max_repairs
+        self.llm_calls = 0
+        self.tool_calls = 0
+
+    async def run_step(self, step: PlanStep, steps: Dict[str, PlanStep]):
+        repairs = 0
+        while True:
+            try:
+                parameters = substitute_placeholders(step.parameters, steps)
+                decision = {"function_name": step.function_name, "parameters": parameters}
+                self.tool_calls += 1
+                step.result = await execute_tool_call(self.session, decision, self.tools)
+                step.parameters = parameters
+                step.status = "done"
+                logger.info(f"Step {step.id} returned: {step.result}")
+                return
+            except Exception as e:
+                step.error = str(e)
+                logger.error(f"Step {step.id} failed: {e}")
+
+            if repairs >= self.max_repairs:
+                step.status = "failed"
+                return
+
+            repairs += 1
+            self.llm_calls += 1
+            try:
+                repaired = await repair_step(self.client, step, steps, self.tools_description)
+            except Exception as e:
+                logger.error(f"Repair of step {step.id} failed: {e}")
+                step.status = "failed"
+                return
+            if not repaired.get("function_name"):
+                step.status = "failed"
+                return
+            step.function_name = repaired["function_name"]
+            step.parameters = repaired.get("parameters", {})
+
+    async def execute(self, steps: Dict[str, PlanStep]) -> Dict[str, PlanStep]:
+        pending = dict(steps)
+        while pending:
+            # Steps depending on a failed or skipped step can never run
+            for step in list(pending.values()):
+                blocked = [dep for dep in step.depends_on if steps[dep].status in ("failed", "skipped")]
+                if blocked:
+                    step.status = "skipped"
+                    step.error = f"depends on unsuccessful steps {sorted(blocked)}"
+                    del pending[step.id]
+
+            ready = [step for step in pending.values() if all(steps[dep].status == "done" for dep in step.depends_on)]
+            if not ready:
+                if pending:
+                    raise PlanError(f"Plan has a dependency cycle between steps: {sorted(pending)}")
+                break
+
+            logger.info(f"Running steps concurrently: {[step.id for step in ready]}")
+            for step in ready:
+                del pending[step.id]
+            await asyncio.gather(*(self.run_step(step, steps) for step in ready))
+
+        return steps
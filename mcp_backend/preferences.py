@@ -0,0 +1,229 @@
+import os
+import re
+import json
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Tuple
+from pydantic import BaseModel
+import logging
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+PREFERENCES_FILE = "user_preferences.json"
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+TIME = r"(\d{1,2}(?::\d{2})?\s*(?:am|pm)?)"
+TIME_RANGE = re.compile(TIME + r"\s*(?:-|to|until|till)\s*" + TIME)
+WORKING_HOURS_PATTERN = re.compile(r"\b(?:work|working|office)\b")
+FOCUS_PATTERN = re.compile(r"\b(?:focus|deep work|no meetings)")
+REMINDER_LEAD_PATTERN = re.compile(r"\bremind.*?(\d+)\s*(minutes?|mins?|hours?|hrs?)\s*(?:before|ahead|early|in advance)")
+# A break or gap is only a buffer between items, "30 minute break for lunch" is not
+BUFFER_PATTERN = re.compile(
+    r"(\d+)\s*(?:minutes?|mins?)\s*(?:of\s*)?(?:buffer|(?:break|gap)?\s*between\s*(?:meetings|items|events))"
+    r"|buffer\s*(?:of\s*)?(\d+)\s*(?:minutes?|mins?)"
+)
+DAYS_PATTERN = re.compile(r"\b(?:" + "|".join(WEEKDAYS) + r"|weekday)s?\b")
+# Days the typed fields cannot express, a clause naming them is only kept as a note
+UNKNOWN_DAYS_PATTERN = re.compile(r"\b(?:mon|tue|tues|wed|weds|thu|thur|thurs|fri|sat|sun|weekend)s?\b")
+# Words that add nothing to a typed preference, anything else left over is kept as a note
+FILLER_WORDS = {
+    "i", "my", "me", "we", "our", "am", "is", "are", "be", "usually", "normally", "always", "only", "prefer",
+    "like", "want", "need", "keep", "please", "from", "at", "on", "the", "a", "an", "and", "every", "each",
+    "day", "days", "hour", "hours", "time", "times", "block", "blocks", "between", "for", "of", "with", "default",
+    "meeting", "meetings", "item", "items", "event", "events"
+}
+
+class FocusBlock(BaseModel):
+    start: str
+    end: str
+    # Lower case weekday names, empty for every day
+    days: List[str] = []
+
+class UserPreferences(BaseModel):
+    work_start: str = "09:00"
+    work_end: str = "17:00"
+    reminder_lead_minutes: int = 15
+    buffer_minutes: int = 0
+    focus_blocks: List[FocusBlock] = []
+    # Free text preferences without a typed field
+    notes: List[str] = []
+    # Typed fields the user set, the others hold defaults that only the tools use
+    parsed_fields: List[str] = []
+
+    def render(self) -> str:
+        """Render the preferences the user set as a bullet list for the system prompt"""
+        lines = []
+        if "working_hours" in self.parsed_fields:
+            lines.append(f"- Working hours: {self.work_start} to {self.work_end}")
+        if "reminder_lead_minutes" in self.parsed_fields:
+            lines.append(f"- Default reminder lead time: {self.reminder_lead_minutes} minutes before")
+        if "buffer_minutes" in self.parsed_fields:
+            lines.append(f"- Buffer between items: {self.buffer_minutes} minutes")
+        for block in self.focus_blocks:
+            days = ", ".join(day.capitalize() for day in block.days) or "every day"
+            lines.append(f"- Focus block: {block.start} to {block.end} on {days}")
+        lines.extend(f"- {note}" for note in self.notes)
+        return "\n".join(lines)
+
+    def focus_intervals(self, start_date: date, end_date: date) -> List[Tuple[datetime, datetime]]:
+        """Return the focus blocks falling on every day from start_date to end_date"""
+        intervals = []
+        day = start_date
+        while day <= end_date:
+            weekday = WEEKDAYS[day.weekday()]
+            for block in self.focus_blocks:
+                if not block.days or weekday in block.days:
+                    intervals.append((
+                        datetime.combine(day, time.fromisoformat(block.start)),
+                        datetime.combine(day, time.fromisoformat(block.end))
+                    ))
+            day += timedelta(days=1)
+        return intervals
+
+def normalize_time(value: str, after: Optional[str] = None, suffix: Optional[str] = None) -> str:
+    """
+    Convert times like 9, 9am, 5:30pm or 17:00 to HH:MM 24-hour format.
+    Times without am/pm take the given suffix, or are moved to the afternoon when
+    they are not after the given time, so 9-5 reads as 09:00-17:00.
+    """
+    match = re.fullmatch(r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)?", value.strip())
+    if match is None:
+        raise ValueError(f"Invalid time: {value}")
+    hour, minute = int(match.group(1)), int(match.group(2) or 0)
+    suffix = match.group(3) or suffix
+    if suffix == "pm" and hour < 12:
+        hour += 12
+    elif suffix == "am" and hour == 12:
+        hour = 0
+    elif suffix is None and after is not None and f"{hour:02d}:{minute:02d}" <= after and hour < 12:
+        hour += 12
+    return time(hour, minute).strftime("%H:%M")
+
+def parse_time_range(text: str) -> Optional[Tuple[str, str]]:
+    match = TIME_RANGE.search(text)
+    if match is None:
+        return None
+    end_suffix = re.search(r"(am|pm)$", match.group(2))
+    start = normalize_time(match.group(1))
+    if end_suffix is not None and re.search(r"(am|pm)$", match.group(1)) is None:
+        # 2-4pm reads as 14:00-16:00, unless that puts the start after the end as in 11-1pm
+        with_suffix = normalize_time(match.group(1), suffix=end_suffix.group(1))
+        if with_suffix < normalize_time(match.group(2)):
+            start = with_suffix
+    return start, normalize_time(match.group(2), after=start)
+
+def split_clauses(entry: str) -> List[str]:
+    """Split an entry on commas, keeping lists of days like "monday, wednesday" with their clause"""
+    clauses = []
+    for clause in entry.split(","):
+        clause = clause.strip()
+        if not clause:
+            continue
+        words = re.findall(r"[a-z]+", clause.lower())
+        if clauses and words and all(DAYS_PATTERN.fullmatch(word) or word == "and" for word in words):
+            clauses[-1] = f"{clauses[-1]}, {clause}"
+        else:
+            clauses.append(clause)
+    return clauses
+
+def is_covered(text: str, patterns: List[re.Pattern]) -> bool:
+    """Return True if nothing but filler words is left of the text once the patterns are removed"""
+    for pattern in patterns:
+        text = pattern.sub(" ", text)
+    return all(word in FILLER_WORDS for word in re.findall(r"[a-z]+", text))
+
+def parse_clause(clause: str, preferences: UserPreferences) -> bool:
+    """Apply a single preference to the typed fields, returns True if they capture all of it"""
+    lowered = clause.lower()
+    if UNKNOWN_DAYS_PATTERN.search(lowered):
+        # Applying the typed field without its days would apply it to every day
+        return False
+    try:
+        time_range = parse_time_range(lowered)
+        if time_range and FOCUS_PATTERN.search(lowered):
+            days = [day for day in WEEKDAYS if day in lowered]
+            if "weekday" in lowered:
+                days = WEEKDAYS[:5]
+            preferences.focus_blocks.append(FocusBlock(start=time_range[0], end=time_range[1], days=days))
+            return is_covered(lowered, [TIME_RANGE, FOCUS_PATTERN, DAYS_PATTERN])
+        if time_range and WORKING_HOURS_PATTERN.search(lowered):
+            preferences.work_start, preferences.work_end = time_range
+            preferences.parsed_fields.append("working_hours")
+            return is_covered(lowered, [TIME_RANGE, WORKING_HOURS_PATTERN])
+    except ValueError as e:
+        logger.warning(f"Could not parse time range in preference '{clause}': {e}")
+
+    match = REMINDER_LEAD_PATTERN.search(lowered)
+    if match:
+        amount = int(match.group(1))
+        preferences.reminder_lead_minutes = amount * 60 if match.group(2).startswith("h") else amount
+        preferences.parsed_fields.append("reminder_lead_minutes")
+        return is_covered(lowered, [REMINDER_LEAD_PATTERN])
+
+    match = BUFFER_PATTERN.search(lowered)
+    if match:
+        preferences.buffer_minutes = int(match.group(1) or match.group(2))
+        preferences.parsed_fields.append("buffer_minutes")
+        return is_covered(lowered, [BUFFER_PATTERN])
+    return False
+
+def parse_preferences(text: str) -> UserPreferences:
+    """
+    Compile free text preferences into typed preferences.
+    Entries are separated by new lines or semicolons and split further on commas.
+    Any part of an entry the typed preferences do not fully capture is kept as a note, in its original words.
+    """
+    preferences = UserPreferences()
+    for entry in re.split(r"[\n;]+", text):
+        for clause in split_clauses(entry):
+            clause = clause.strip(" .-*\t")
+            if clause and not parse_clause(clause, preferences):
+                preferences.notes.append(clause)
+    preferences.parsed_fields = list(dict.fromkeys(preferences.parsed_fields))
+    return preferences
+
+class PreferenceStore:
+    """
+    Typed user preferences stored as JSON.
+    Loaded once per process and reloaded only when the file's mtime changes.
+    """
+    def __init__(self, filepath: str = PREFERENCES_FILE):
+        self.filepath = filepath
+        self.preferences = UserPreferences()
+        self.mtime = None
+
+    def get(self) -> UserPreferences:
+        """Return the preferences, reloading them if the file changed"""
+        try:
+            mtime = os.stat(self.filepath).st_mtime_ns
+        except FileNotFoundError:
+            return self.preferences
+        if mtime != self.mtime:
+            self.preferences = self.load()
+            self.mtime = mtime
+        return self.preferences
+
+    def load(self) -> UserPreferences:
+        with open(self.filepath, "r") as f:
+            data = json.load(f)
+        # Migrate the memory list written by older versions: [{"content": "User preferences: ..."}]
+        if isinstance(data, list):
+            text = "\n".join(m["content"].split(":", 1)[-1] for m in data if m.get("content", "").startswith("User preferences"))
+            return parse_preferences(text)
+        return UserPreferences.model_validate(data)
+
+    def save(self, preferences: UserPreferences):
+        with open(self.filepath, "w") as f:
+            json.dump(preferences.model_dump(), f, indent=2)
+        self.preferences = preferences
+        self.mtime = os.stat(self.filepath).st_mtime_ns
+
+    def update_from_text(self, text: str) -> UserPreferences:
+        """Replace the preferences with the ones compiled from free text"""
+        preferences = parse_preferences(text)
+        self.save(preferences)
+        return preferences
+
+# Shared by everything running in this process
+preference_store = PreferenceStore()
@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import heapq
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+import requests
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from sse_starlette.sse import EventSourceResponse
+import logging
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+STORE_URL = os.environ.get('NOTETAKER_SERVER_URL', 'http://localhost:3000')
+
+def reminder_due_time(reminder: Dict[str, Any]) -> Optional[float]:
+    """Return the local due time of a reminder as a unix timestamp, None if it has no valid date"""
+    try:
+        return datetime.fromisoformat(f"{reminder['date'][:10]}T{reminder.get('time') or '00:00'}").timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+class ReminderScheduler:
+    """
+    Timer heap of pending reminders ordered by due time.
+    Cancelled and rescheduled reminders leave stale heap entries behind, they are
+    skipped when they reach the top and compacted away when they pile up.
+    """
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.heap = []
+        # reminder id -> (due time, sequence number, reminder) of the live heap entry
+        self.entries: Dict[str, tuple] = {}
+        self.counter = itertools.count()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def schedule(self, reminder: Dict[str, Any]) -> bool:
+        """Add or reschedule a reminder, returns False if it will never fire"""
+        due = reminder_due_time(reminder)
+        if due is None or reminder.get("triggered"):
+            self.cancel(reminder.get("id"))
+            return False
+
+        entry = (due, next(self.counter), reminder)
+        self.entries[reminder["id"]] = entry
+        heapq.heappush(self.heap, (due, entry[1], reminder["id"]))
+        self.compact()
+        return True
+
+    def cancel(self, reminder_id: str) -> bool:
+        """Remove a pending reminder, returns False if it was not scheduled"""
+        return self.entries.pop(reminder_id, None) is not None
+
+    def is_live(self, heap_entry: tuple) -> bool:
+        entry = self.entries.get(heap_entry[2])
+        return entry is not None and entry[1] == heap_entry[1]
+
+    def next_due(self) -> Optional[float]:
+        """Return the due time of the earliest pending reminder"""
+        while self.heap and not self.is_live(self.heap[0]):
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Remove and return all reminders due at or before now, earliest first"""
+        now = self.clock() if now is None else now
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            heap_entry = heapq.heappop(self.heap)
+            if self.is_live(heap_entry):
+                due.append(self.entries.pop(heap_entry[2])[2])
+        return due
+
+    def compact(self):
+        """Drop stale entries once they make up more than half of the heap"""
+        if len(self.heap) > 2 * len(self.entries) + 64:
+            self.heap = [(due, seq, reminder_id) for reminder_id, (due, seq, _) in self.entries.items()]
+            heapq.heapify(self.heap)
+
+class ReminderService:
+    """
+    Fire reminders from the timer heap and push them to subscribers.
+    The NoteTaker server notifies the service when reminders are created, updated
+    or deleted, a periodic incremental sync catches anything it missed.
+    """
+    def __init__(self, store_url: str = STORE_URL, sync_interval: float = 60.0):
+        self.store_url = store_url
+        self.sync_interval = sync_interval
+        self.scheduler = ReminderScheduler()
+        self.subscribers = set()
+        self.wakeup = asyncio.Event()
+        self.last_sync = None
+        self.tasks = set()
+
+    def schedule(self, reminder: Dict[str, Any]) -> bool:
+        scheduled = self.scheduler.schedule(reminder)
+        self.wakeup.set()
+        return scheduled
+
+    def cancel(self, reminder_id: str) -> bool:
+        return self.scheduler.cancel(reminder_id)
+
+    def fetch_reminders(self, updated_since: Optional[str]) -> List[Dict[str, Any]]:
+        params = {"type": "reminder"}
+        if updated_since:
+            params["updatedSince"] = updated_since
+        response = requests.get(f"{self.store_url}/api/notes", params=params)
+        response.raise_for_status()
+        return response.json()
+
+    async def sync(self):
+        """Load reminders created or updated since the last sync from the store"""
+        sync_start = datetime.now(timezone.utc).isoformat()
+        reminders = await asyncio.to_thread(self.fetch_reminders, self.last_sync)
+        scheduled = sum(self.schedule(reminder) for reminder in reminders)
+        self.last_sync = sync_start
+        logger.info(f"Synced {len(reminders)} reminders, {scheduled} scheduled, {len(self.scheduler)} pending")
+
+    async def run_sync(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Error syncing reminders: {e}")
+            await asyncio.sleep(self.sync_interval)
+
+    async def run_timer(self):
+        """Sleep until the next reminder is due or the schedule changes, then fire due reminders"""
+        while True:
+            self.wakeup.clear()
+            due = self.scheduler.next_due()
+            # Wake up at least every minute so clock changes and suspends are picked up
+            timeout = 60.0 if due is None else min(60.0, max(0.0, due - time.time()))
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+            for reminder in self.scheduler.pop_due():
+                task = asyncio.create_task(self.fire(reminder))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+
+    def fetch_note(self, reminder_id: str) -> Optional[Dict[str, Any]]:
+        response = requests.get(f"{self.store_url}/api/notes/{reminder_id}")
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def mark_triggered(self, reminder_id: str):
+        response = requests.put(f"{self.store_url}/api/notes/{reminder_id}", json={"triggered": True})
+        response.raise_for_status()
+
+    async def fire(self, reminder: Dict[str, Any]):
+        """Push a due reminder to subscribers and mark it as triggered in the store"""
+        try:
+            # The reminder may have been deleted or triggered without us being told
+            note = await asyncio.to_thread(self.fetch_note, reminder["id"])
+            if note is None or note.get("triggered"):
+                return
+            reminder = note
+            await asyncio.to_thread(self.mark_triggered, reminder["id"])
+        except Exception as e:
+            logger.error(f"Error updating reminder {reminder['id']} in store: {e}")
+
+        logger.info(f"Firing reminder {reminder['id']} to {len(self.subscribers)} subscribers")
+        self.publish(reminder)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=100)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+    def publish(self, reminder: Dict[str, Any]):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(reminder)
+            except asyncio.QueueFull:
+                # Drop subscribers that stopped reading
+                logger.warning("Dropping slow reminder subscriber")
+                self.unsubscribe(queue)
+
+def create_app(service: ReminderService) -> Starlette:
+    """Create the HTTP API of the reminder scheduler"""
+
+    async def upsert_reminder(request: Request):
+        reminder = await request.json()
+        if not reminder.get("id"):
+            return JSONResponse({"error": "Reminder id is required"}, status_code=400)
+        return JSONResponse({"id": reminder["id"], "scheduled": service.schedule(reminder)})
+
+    async def delete_reminder(request: Request):
+        reminder_id = request.path_params["id"]
+        return JSONResponse({"id": reminder_id, "cancelled": service.cancel(reminder_id)})
+
+    async def status(request: Request):
+        return JSONResponse({
+            "pending": len(service.scheduler),
+            "next_due": service.scheduler.next_due(),
+            "subscribers": len(service.subscribers)
+        })
+
+    async def events(request: Request):
+        queue = service.subscribe()
+
+        async def stream():
+            try:
+                while True:
+                    reminder = await queue.get()
+                    yield {"event": "reminder", "data": json.dumps(reminder)}
+            finally:
+                service.unsubscribe(queue)
+
+        return EventSourceResponse(stream(), ping=15)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        tasks = [asyncio.create_task(service.run_sync()), asyncio.create_task(service.run_timer())]
+        yield
+        for task in tasks:
+            task.cancel()
+
+    return Starlette(
+        routes=[
+            Route("/reminders", upsert_reminder, methods=["POST"]),
+            Route("/reminders", status, methods=["GET"]),
+            Route("/reminders/{id}", delete_reminder, methods=["DELETE"]),
+            Route("/events", events, methods=["GET"]),
+        ],
+        lifespan=lifespan
+    )
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    port = int(os.environ.get('REMINDER_SCHEDULER_PORT', 3001))
+    service = ReminderService(sync_interval=float(os.environ.get('REMINDER_SYNC_INTERVAL', 60)))
+    uvicorn.run(create_app(service), host="localhost", port=port)
@@ -0,0 +1,198 @@
+import bisect
+from datetime import datetime, date, time, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+def parse_time(day: date, value: str) -> datetime:
+    """Combine a date and a time in HH:MM 24-hour format"""
+    return datetime.combine(day, time.fromisoformat(value))
+
+def parse_date(value: str) -> date:
+    """Parse a date in YYYY-MM-DD format, ISO datetimes are cut to their date"""
+    return date.fromisoformat(value[:10])
+
+class Interval:
+    def __init__(self, note_id: str, note_type: str, content: str, start: datetime, end: datetime):
+        self.id = note_id
+        self.type = note_type
+        self.content = content
+        self.start = start
+        self.end = end
+
+    def to_dict(self) -> Dict[str, str]:
+        return {
+            "id": self.id,
+            "type": self.type,
+            "content": self.content,
+            "date": self.start.strftime("%Y-%m-%d"),
+            "start_time": self.start.strftime("%H:%M"),
+            "end_time": self.end.strftime("%H:%M")
+        }
+
+def note_interval(note: Dict[str, Any], reminder_minutes: int = 15) -> Optional[Interval]:
+    """
+    Return the time a note occupies, None for notes without a time.
+    Blockers and events use startTime and endTime, reminders occupy reminder_minutes from their time.
+    """
+    try:
+        day = parse_date(note["date"])
+        if note.get("type") in ("blocker", "event") and note.get("startTime") and note.get("endTime"):
+            start, end = parse_time(day, note["startTime"]), parse_time(day, note["endTime"])
+        elif note.get("type") == "reminder" and note.get("time"):
+            start = parse_time(day, note["time"])
+            end = start + timedelta(minutes=reminder_minutes)
+        else:
+            return None
+    except (KeyError, TypeError, ValueError):
+        logger.warning(f"Skipping note with invalid date or time: {note.get('id')}")
+        return None
+
+    if end <= start:
+        return None
+    return Interval(note["id"], note["type"], note.get("content", ""), start, end)
+
+def untimed_event(note: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """Return an event without start and end time as a dict, None for any other note"""
+    if note.get("type") != "event" or (note.get("startTime") and note.get("endTime")):
+        return None
+    try:
+        day = parse_date(note["date"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return {"id": note["id"], "type": "event", "content": note.get("content", ""), "date": day.isoformat()}
+
+class ScheduleIndex:
+    """
+    Sorted interval index over timed events, blockers and reminders.
+    Intervals are kept sorted by start time, overlap queries bisect to the
+    query end and scan back no further than the longest interval.
+    Events created without a time are kept per date, they cannot be placed
+    on the day and are reported next to the free slots and conflicts instead.
+    """
+    def __init__(self, reminder_minutes: int = 15):
+        self.reminder_minutes = reminder_minutes
+        self.keys: List[Tuple[datetime, str]] = []
+        self.intervals: Dict[str, Interval] = {}
+        self.max_length = timedelta(0)
+        # date -> note id -> untimed event
+        self.untimed: Dict[date, Dict[str, Dict[str, str]]] = {}
+        self.untimed_dates: Dict[str, date] = {}
+
+    def __len__(self):
+        return len(self.intervals) + len(self.untimed_dates)
+
+    def add(self, note: Dict[str, Any]):
+        """Add or update a note"""
+        self.remove(note.get("id"))
+        if note.get("triggered") and note.get("type") == "reminder":
+            return
+        event = untimed_event(note)
+        if event is not None:
+            day = parse_date(event["date"])
+            self.untimed.setdefault(day, {})[event["id"]] = event
+            self.untimed_dates[event["id"]] = day
+            return
+        interval = note_interval(note, self.reminder_minutes)
+        if interval is None:
+            return
+        self.intervals[interval.id] = interval
+        bisect.insort(self.keys, (interval.start, interval.id))
+        self.max_length = max(self.max_length, interval.end - interval.start)
+
+    def remove(self, note_id: str) -> bool:
+        """Remove a note, returns False if it was not indexed"""
+        day = self.untimed_dates.pop(note_id, None)
+        if day is not None:
+            del self.untimed[day][note_id]
+            if not self.untimed[day]:
+                del self.untimed[day]
+            return True
+        interval = self.intervals.pop(note_id, None)
+        if interval is None:
+            return False
+        index = bisect.bisect_left(self.keys, (interval.start, interval.id))
+        del self.keys[index]
+        return True
+
+    def clear(self):
+        self.keys = []
+        self.intervals = {}
+        self.max_length = timedelta(0)
+        self.untimed = {}
+        self.untimed_dates = {}
+
+    def untimed_events(self, start_date: date, end_date: date) -> List[Dict[str, str]]:
+        """Return the events without a time from start_date to end_date"""
+        events = []
+        day = start_date
+        while day <= end_date:
+            events.extend(self.untimed.get(day, {}).values())
+            day += timedelta(days=1)
+        return events
+
+    def overlapping(self, start: datetime, end: datetime) -> List[Interval]:
+        """Return the intervals overlapping [start, end) sorted by start time"""
+        low = bisect.bisect_left(self.keys, (start - self.max_length, ""))
+        high = bisect.bisect_left(self.keys, (end, ""))
+        return [
+            self.intervals[note_id]
+            for _, note_id in self.keys[low:high]
+            if self.intervals[note_id].end > start
+        ]
+
+    def conflicts(self, start: datetime, end: datetime, buffer_minutes: int = 0) -> List[Interval]:
+        """Return the intervals conflicting with a proposed time, including the buffer around it"""
+        buffer = timedelta(minutes=buffer_minutes)
+        return self.overlapping(start - buffer, end + buffer)
+
+    def free_slots(
+        self,
+        start_date: date,
+        end_date: date,
+        duration_minutes: int,
+        work_start: str = "09:00",
+        work_end: str = "17:00",
+        buffer_minutes: int = 0,
+        not_before: Optional[datetime] = None,
+        max_slots: int = 10,
+        extra_busy: List[Tuple[datetime, datetime]] = ()
+    ) -> List[Dict[str, str]]:
+        """
+        Return the free slots of at least duration_minutes within working hours
+        of every day from start_date to end_date, keeping buffer_minutes away from
+        busy intervals and from the extra busy (start, end) times.
+        """
+        duration = timedelta(minutes=duration_minutes)
+        buffer = timedelta(minutes=buffer_minutes)
+        slots = []
+
+        day = start_date
+        while day <= end_date and len(slots) < max_slots:
+            window_start, window_end = parse_time(day, work_start), parse_time(day, work_end)
+            if not_before is not None:
+                window_start = max(window_start, not_before)
+
+            busy = [(interval.start, interval.end) for interval in self.overlapping(window_start - buffer, window_end + buffer)]
+            if extra_busy:
+                busy = sorted(busy + [
+                    (start, end) for start, end in extra_busy
+                    if start < window_end + buffer and end > window_start - buffer
+                ])
+
+            cursor = window_start
+            for start, end in busy:
+                busy_start = start - buffer
+                if busy_start - cursor >= duration:
+                    slots.append((cursor, busy_start))
+                cursor = max(cursor, end + buffer)
+            if window_end - cursor >= duration:
+                slots.append((cursor, window_end))
+            day += timedelta(days=1)
+
+        return [
+            {"date": start.strftime("%Y-%m-%d"), "start_time": start.strftime("%H:%M"), "end_time": end.strftime("%H:%M")}
+            for start, end in slots[:max_slots]
+        ]
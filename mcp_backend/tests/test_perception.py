@@ -0,0 +1,21 @@
+import pytest
+from perception import parse_json_response, extract_json_object
+
+def test_truncated_output_closes_arrays_and_objects_in_order():
+    result = parse_json_response('{"function_name": "x", "parameters": {"ids": [1, 2')
+    assert result == {"function_name": "x", "parameters": {"ids": [1, 2]}}
+
+def test_truncated_output_inside_string_and_after_comma():
+    assert parse_json_response('{"parameters": {"tags": ["a", "b') == {"parameters": {"tags": ["a", "b"]}}
+    assert parse_json_response('{"parameters": {"ids": [[1, 2], [3,') == {"parameters": {"ids": [[1, 2], [3]]}}
+
+def test_prose_around_object_is_cut():
+    text = 'Here you go: {"steps": [{"id": "s1"}], "your_comment": "done"} hope it helps [1]'
+    assert extract_json_object(text) == '{"steps": [{"id": "s1"}], "your_comment": "done"}'
+
+def test_python_literals_and_single_quotes_are_repaired():
+    assert parse_json_response("{'final_iteration': True, 'parameters': None}") == {"final_iteration": True, "parameters": None}
+
+def test_no_object_fails():
+    with pytest.raises(ValueError):
+        parse_json_response("I cannot help with that")
@@ -0,0 +1,117 @@
+import asyncio
+import pytest
+import planner
+from planner import PlanError, PlanExecutor, parse_plan, substitute_placeholders, extract_field
+
+def step(step_id, function_name, parameters=None, depends_on=None):
+    return {"id": step_id, "function_name": function_name, "parameters": parameters or {}, "depends_on": depends_on or []}
+
+class StubTools:
+    """Stand-in for execute_tool_call that records calls and how many ran at once"""
+    def __init__(self, results=None, delay=0.05):
+        self.results = results or {}
+        self.delay = delay
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+
+    async def __call__(self, session, decision, tools):
+        self.calls.append((decision["function_name"], decision["parameters"]))
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(self.delay)
+        self.running -= 1
+        result = self.results.get(decision["function_name"], "ok")
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+def execute(monkeypatch, steps, stub, repair=None):
+    monkeypatch.setattr(planner, "execute_tool_call", stub)
+    if repair is not None:
+        monkeypatch.setattr(planner, "repair_step", repair)
+    executor = PlanExecutor(None, None, [], "")
+    asyncio.run(executor.execute(steps))
+    return executor
+
+def test_parse_plan_adds_placeholder_dependencies():
+    steps = parse_plan({"steps": [step("s1", "create_todo"), step("s2", "complete_todo", {"id": "{{s1.id}}"})]})
+    assert steps["s2"].depends_on == {"s1"}
+
+@pytest.mark.parametrize("plan", [
+    None,
+    {"steps": "list_todos"},
+    {"steps": ["list_todos"]},
+    {"steps": [{"id": "s1"}]},
+    {"steps": [step("s1", "list_todos"), step("s1", "list_events")]},
+    {"steps": [{"id": "s1", "function_name": "list_todos", "parameters": "2025-05-01"}]},
+    {"steps": [step("s1", "list_todos"), {"id": "s2", "function_name": "delete_todo", "depends_on": "s1"}]},
+    {"steps": [step("s1", "list_todos", depends_on=["s9"])]},
+    {"steps": [step("s1", "list_todos", depends_on=["s2"]), step("s2", "list_events", depends_on=["s1"])]},
+    {"steps": [step("s1", "delete_todo", {"id": "{{s1.id}}"})]},
+])
+def test_malformed_plans_raise_plan_error(plan):
+    with pytest.raises(PlanError):
+        parse_plan(plan)
+
+def test_extract_field():
+    assert extract_field("Todo created successfully with id: abc123", "id") == "abc123"
+    assert extract_field('{"id": 7, "text": "x"}', "id") == 7
+    assert extract_field({"result": "Event created with id: e-1"}, "id") == "e-1"
+    assert extract_field("anything", None) == "anything"
+    with pytest.raises(ValueError):
+        extract_field("no id here", "id")
+
+def test_substitute_placeholders():
+    steps = parse_plan({"steps": [step("s1", "create_todo"), step("s2", "list_todos")]})
+    steps["s1"].result = '{"id": 7}'
+    steps["s2"].result = "3 todos"
+    parameters = {"id": "{{s1.id}}", "text": "after {{ s2 }}", "ids": ["{{s1.id}}"], "count": 2}
+    assert substitute_placeholders(parameters, steps) == {"id": 7, "text": "after 3 todos", "ids": [7], "count": 2}
+
+def test_independent_steps_run_concurrently(monkeypatch):
+    steps = parse_plan({"steps": [step("s1", "list_todos"), step("s2", "list_events"), step("s3", "list_reminders")]})
+    stub = StubTools()
+    executor = execute(monkeypatch, steps, stub)
+    assert stub.max_running == 3
+    assert executor.tool_calls == 3
+    assert all(s.status == "done" for s in steps.values())
+
+def test_dependent_step_gets_result_of_its_dependency(monkeypatch):
+    steps = parse_plan({"steps": [step("s1", "create_todo"), step("s2", "complete_todo", {"id": "{{s1.id}}"})]})
+    stub = StubTools({"create_todo": "Todo created successfully with id: abc123"})
+    execute(monkeypatch, steps, stub)
+    assert stub.calls == [("create_todo", {}), ("complete_todo", {"id": "abc123"})]
+
+def test_step_after_failed_dependency_is_skipped(monkeypatch):
+    steps = parse_plan({"steps": [step("s1", "create_todo"), step("s2", "complete_todo", depends_on=["s1"]), step("s3", "list_events")]})
+    stub = StubTools({"create_todo": RuntimeError("store is down")})
+
+    async def repair(client, failed, all_steps, tools_description):
+        # The LLM gives up on the step
+        return {"function_name": "", "parameters": {}}
+
+    executor = execute(monkeypatch, steps, stub, repair)
+    assert [s.status for s in steps.values()] == ["failed", "skipped", "done"]
+    assert executor.llm_calls == 1
+    assert [name for name, _ in stub.calls] == ["create_todo", "list_events"]
+
+def test_failed_step_is_repaired(monkeypatch):
+    steps = parse_plan({"steps": [step("s1", "create_todo", {"txt": "milk"})]})
+    stub = StubTools({"create_todo": RuntimeError("text parameter in not provided")})
+
+    async def repair(client, failed, all_steps, tools_description):
+        stub.results["create_todo"] = "Todo created successfully with id: t1"
+        return {"function_name": "create_todo", "parameters": {"text": "milk"}}
+
+    executor = execute(monkeypatch, steps, stub, repair)
+    assert steps["s1"].status == "done"
+    assert steps["s1"].parameters == {"text": "milk"}
+    assert (executor.llm_calls, executor.tool_calls) == (1, 2)
+
+def test_executor_rejects_cycle(monkeypatch):
+    steps = parse_plan({"steps": [step("s1", "list_todos"), step("s2", "list_events")]})
+    steps["s1"].depends_on.add("s2")
+    steps["s2"].depends_on.add("s1")
+    with pytest.raises(PlanError):
+        execute(monkeypatch, steps, StubTools())
@@ -0,0 +1,73 @@
+from preferences import parse_preferences, parse_time_range, FocusBlock, UserPreferences
+
+def test_comma_separated_preferences_keep_untyped_parts_as_notes():
+    preferences = parse_preferences("Buy groceries on sunday, work 9-5")
+    assert (preferences.work_start, preferences.work_end) == ("09:00", "17:00")
+    assert preferences.notes == ["Buy groceries on sunday"]
+    assert "- Buy groceries on sunday" in preferences.render()
+
+def test_entry_only_partly_captured_is_kept_as_note():
+    preferences = parse_preferences("I work 9-5 and go to the gym on sunday")
+    assert (preferences.work_start, preferences.work_end) == ("09:00", "17:00")
+    assert preferences.notes == ["I work 9-5 and go to the gym on sunday"]
+
+def test_fully_captured_entries_add_no_notes():
+    preferences = parse_preferences("My working hours are 9am to 6pm\nremind me 30 minutes before; 10 minutes buffer between meetings")
+    assert (preferences.work_start, preferences.work_end) == ("09:00", "18:00")
+    assert preferences.reminder_lead_minutes == 30
+    assert preferences.buffer_minutes == 10
+    assert preferences.notes == []
+
+def test_end_suffix_applies_to_start():
+    assert parse_time_range("2-4pm") == ("14:00", "16:00")
+    assert parse_time_range("9-11am") == ("09:00", "11:00")
+    # A start that would come after the end keeps the morning
+    assert parse_time_range("11-1pm") == ("11:00", "13:00")
+    assert parse_time_range("9-5pm") == ("09:00", "17:00")
+
+def test_range_without_suffix_moves_end_to_afternoon():
+    assert parse_time_range("9-5") == ("09:00", "17:00")
+    assert parse_time_range("9:30 to 17:30") == ("09:30", "17:30")
+
+def test_focus_block_on_weekdays():
+    preferences = parse_preferences("focus 2-4pm on weekdays")
+    assert preferences.focus_blocks == [
+        FocusBlock(start="14:00", end="16:00", days=["monday", "tuesday", "wednesday", "thursday", "friday"])
+    ]
+    assert preferences.notes == []
+
+def test_days_after_comma_stay_with_their_focus_block():
+    preferences = parse_preferences("focus 9-11 on Monday, Wednesday")
+    assert preferences.focus_blocks == [FocusBlock(start="09:00", end="11:00", days=["monday", "wednesday"])]
+    assert preferences.notes == []
+
+def test_workout_does_not_set_working_hours():
+    preferences = parse_preferences("work 8-4, workout 6-7am")
+    assert (preferences.work_start, preferences.work_end) == ("08:00", "16:00")
+    assert preferences.notes == ["workout 6-7am"]
+
+def test_unparsed_text_is_kept():
+    assert parse_preferences("Prefer meetings in the morning").notes == ["Prefer meetings in the morning"]
+    assert parse_preferences("").notes == []
+
+def test_only_preferences_the_user_set_are_rendered():
+    assert UserPreferences().render() == ""
+    preferences = parse_preferences("remind me 30 minutes before")
+    assert preferences.render() == "- Default reminder lead time: 30 minutes before"
+    # The tools still get the defaults
+    assert (preferences.work_start, preferences.work_end, preferences.buffer_minutes) == ("09:00", "17:00", 0)
+
+def test_break_is_not_a_buffer():
+    preferences = parse_preferences("30 minute break for lunch at 12")
+    assert preferences.buffer_minutes == 0
+    assert preferences.notes == ["30 minute break for lunch at 12"]
+    assert parse_preferences("15 minute gap between meetings").buffer_minutes == 15
+    assert parse_preferences("buffer of 5 minutes").buffer_minutes == 5
+
+def test_unrecognised_days_keep_clause_as_note():
+    preferences = parse_preferences("focus 9-11am mon-fri")
+    assert preferences.focus_blocks == []
+    assert preferences.notes == ["focus 9-11am mon-fri"]
+    preferences = parse_preferences("work 10-2 on weekends")
+    assert (preferences.work_start, preferences.work_end) == ("09:00", "17:00")
+    assert preferences.notes == ["work 10-2 on weekends"]
@@ -0,0 +1,67 @@
+from datetime import datetime
+from reminder_scheduler import ReminderScheduler, reminder_due_time
+
+def reminder(reminder_id, time, date="2025-05-01", **fields):
+    return {"id": reminder_id, "type": "reminder", "date": date, "time": time, **fields}
+
+def due(time, date="2025-05-01"):
+    return datetime.fromisoformat(f"{date}T{time}").timestamp()
+
+def test_due_time():
+    assert reminder_due_time(reminder("r", "18:30")) == due("18:30")
+    assert reminder_due_time({"id": "r", "date": "2025-05-01T00:00:00.000Z"}) == due("00:00")
+    assert reminder_due_time({"id": "r", "date": "tomorrow"}) is None
+
+def test_pop_due_returns_due_reminders_earliest_first():
+    scheduler = ReminderScheduler()
+    for reminder_id, time in [("c", "12:00"), ("a", "09:00"), ("b", "10:00")]:
+        scheduler.schedule(reminder(reminder_id, time))
+    assert scheduler.next_due() == due("09:00")
+    assert [r["id"] for r in scheduler.pop_due(due("11:00"))] == ["a", "b"]
+    assert len(scheduler) == 1
+    assert scheduler.pop_due(due("11:59")) == []
+    assert [r["id"] for r in scheduler.pop_due(due("12:00"))] == ["c"]
+    assert scheduler.next_due() is None
+
+def test_cancelled_reminder_leaves_stale_entry_that_never_fires():
+    scheduler = ReminderScheduler()
+    scheduler.schedule(reminder("a", "09:00"))
+    scheduler.schedule(reminder("b", "10:00"))
+    assert scheduler.cancel("a") is True
+    assert scheduler.cancel("a") is False
+    assert len(scheduler.heap) == 2
+    assert scheduler.next_due() == due("10:00")
+    assert [r["id"] for r in scheduler.pop_due(due("23:00"))] == ["b"]
+
+def test_rescheduled_reminder_fires_once_at_its_new_time():
+    scheduler = ReminderScheduler()
+    scheduler.schedule(reminder("a", "09:00"))
+    scheduler.schedule(reminder("a", "15:00", content="moved"))
+    assert scheduler.pop_due(due("10:00")) == []
+    assert scheduler.pop_due(due("15:00")) == [reminder("a", "15:00", content="moved")]
+    assert scheduler.pop_due(due("23:00")) == []
+
+def test_triggered_and_invalid_reminders_are_dropped():
+    scheduler = ReminderScheduler()
+    scheduler.schedule(reminder("a", "09:00"))
+    assert scheduler.schedule(reminder("a", "09:00", triggered=True)) is False
+    assert scheduler.schedule(reminder("b", "25:00")) is False
+    assert len(scheduler) == 0
+    assert scheduler.pop_due(due("23:00")) == []
+
+def test_compact_drops_stale_entries():
+    scheduler = ReminderScheduler()
+    scheduler.schedule(reminder("keep", "08:00"))
+    for i in range(200):
+        scheduler.schedule(reminder("moving", f"{9 + i % 10:02d}:00"))
+    # Without compaction the heap would hold all 201 entries
+    assert len(scheduler.heap) <= 2 * len(scheduler) + 65
+    assert [r["id"] for r in scheduler.pop_due(due("23:00"))] == ["keep", "moving"]
+
+def test_pop_due_uses_the_clock():
+    now = [due("08:00")]
+    scheduler = ReminderScheduler(clock=lambda: now[0])
+    scheduler.schedule(reminder("a", "09:00"))
+    assert scheduler.pop_due() == []
+    now[0] = due("09:00")
+    assert [r["id"] for r in scheduler.pop_due()] == ["a"]
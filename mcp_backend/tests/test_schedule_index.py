@@ -0,0 +1,77 @@
+from datetime import date, datetime
+from schedule_index import ScheduleIndex
+
+DAY = date(2025, 5, 1)
+
+def at(value, day=DAY):
+    return datetime.combine(day, datetime.strptime(value, "%H:%M").time())
+
+def event(note_id, start, end, day="2025-05-01"):
+    return {"id": note_id, "type": "event", "date": day, "startTime": start, "endTime": end, "content": note_id}
+
+def build(*notes):
+    index = ScheduleIndex()
+    for note in notes:
+        index.add(note)
+    return index
+
+def slots(index, duration=60, **kwargs):
+    return [(slot["start_time"], slot["end_time"]) for slot in index.free_slots(DAY, DAY, duration, **kwargs)]
+
+def test_overlapping_is_half_open_and_sorted():
+    index = build(event("b", "11:00", "12:00"), event("a", "09:00", "10:00"))
+    assert [i.id for i in index.overlapping(at("08:00"), at("13:00"))] == ["a", "b"]
+    assert index.overlapping(at("10:00"), at("11:00")) == []
+    assert [i.id for i in index.overlapping(at("09:59"), at("10:30"))] == ["a"]
+
+def test_long_interval_found_by_back_scan():
+    # The all day blocker starts long before the query, it is only found by scanning back max_length
+    index = build(
+        {"id": "day", "type": "blocker", "date": "2025-05-01", "startTime": "06:00", "endTime": "20:00"},
+        event("short", "07:00", "07:30"),
+    )
+    assert [i.id for i in index.overlapping(at("15:00"), at("16:00"))] == ["day"]
+
+def test_conflicts_include_buffer():
+    index = build(event("a", "10:00", "11:00"))
+    assert index.conflicts(at("11:10"), at("12:00")) == []
+    assert [i.id for i in index.conflicts(at("11:10"), at("12:00"), buffer_minutes=15)] == ["a"]
+
+def test_reminders_occupy_their_minutes_and_triggered_ones_are_dropped():
+    index = build(
+        {"id": "r1", "type": "reminder", "date": "2025-05-01", "time": "09:00"},
+        {"id": "r2", "type": "reminder", "date": "2025-05-01", "time": "12:00", "triggered": True},
+    )
+    assert [(i.id, i.end.strftime("%H:%M")) for i in index.overlapping(at("08:00"), at("13:00"))] == [("r1", "09:15")]
+
+def test_free_slots_with_buffer_and_extra_busy():
+    index = build(event("a", "10:00", "11:00"), event("b", "13:00", "14:00"))
+    assert slots(index) == [("09:00", "10:00"), ("11:00", "13:00"), ("14:00", "17:00")]
+    assert slots(index, buffer_minutes=15) == [("11:15", "12:45"), ("14:15", "17:00")]
+    assert slots(index, extra_busy=[(at("14:00"), at("16:30"))]) == [("09:00", "10:00"), ("11:00", "13:00")]
+
+def test_free_slots_respect_not_before_and_max_slots():
+    index = build()
+    assert slots(index, not_before=at("15:30")) == [("15:30", "17:00")]
+    assert slots(index, not_before=at("16:30")) == []
+    days = ScheduleIndex().free_slots(DAY, date(2025, 5, 20), 60, max_slots=3)
+    assert [slot["date"] for slot in days] == ["2025-05-01", "2025-05-02", "2025-05-03"]
+
+def test_update_and_remove():
+    index = build(event("a", "10:00", "11:00"))
+    index.add(event("a", "15:00", "16:00"))
+    assert len(index) == 1
+    assert index.overlapping(at("10:00"), at("11:00")) == []
+    assert index.remove("a") is True
+    assert index.remove("a") is False
+    assert len(index) == 0 and index.keys == []
+
+def test_untimed_events_are_listed_not_busy():
+    index = build({"id": "u", "type": "event", "date": "2025-05-02", "content": "Offsite"}, {"id": "t", "type": "todo", "date": "2025-05-02"})
+    assert len(index) == 1
+    assert index.untimed_events(DAY, date(2025, 5, 3)) == [{"id": "u", "type": "event", "content": "Offsite", "date": "2025-05-02"}]
+    assert index.free_slots(date(2025, 5, 2), date(2025, 5, 2), 480) != []
+    # Getting a time moves the event to the intervals
+    index.add(event("u", "09:00", "17:00", day="2025-05-02"))
+    assert index.untimed_events(DAY, date(2025, 5, 3)) == []
+    assert index.remove("u") and len(index) == 0
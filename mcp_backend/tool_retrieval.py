@@ -0,0 +1,197 @@
+import re
+import math
+from collections import Counter
+from typing import Dict, Any, List, Iterable
+from decision import tool_parameters
+import logging
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Tools always offered to the LLM, most requests need the current date or time
+CORE_TOOLS = ["get_current_date", "get_current_day", "get_current_time"]
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "the", "to", "of", "for", "in", "on", "at", "by", "is", "it", "me", "my",
+    "i", "you", "your", "with", "what", "should", "do", "next", "given", "this", "that", "be", "can"
+}
+# Everyday words mapped to the words used in the tool descriptions
+SYNONYMS = {
+    "remind": ["reminder"],
+    "meeting": ["event"],
+    "appointment": ["event"],
+    "schedule": ["event", "create"],
+    "book": ["event", "create"],
+    "task": ["todo"],
+    "add": ["create"],
+    "new": ["create"],
+    "done": ["complete"],
+    "finish": ["complete"],
+    "finished": ["complete"],
+    "undo": ["uncomplete"],
+    "reopen": ["uncomplete"],
+    "remove": ["delete"],
+    "cancel": ["delete"],
+    "show": ["list"],
+    "planned": ["list"],
+    "free": ["free", "slot"],
+    "available": ["free", "slot"],
+    "busy": ["conflicting"],
+    "clash": ["conflicting"],
+    "overlap": ["conflicting"],
+    "conflict": ["conflicting"],
+    "tomorrow": ["date"],
+    "today": ["date"],
+    "weekday": ["day", "week"],
+}
+
+def tokenize(text: str) -> List[str]:
+    """Lower case words without stopwords, with plural s dropped"""
+    tokens = []
+    for word in TOKEN_PATTERN.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+def expand_synonyms(tokens: Iterable[str]) -> List[str]:
+    expanded = []
+    for token in tokens:
+        expanded.append(token)
+        expanded.extend(SYNONYMS.get(token, []))
+    return expanded
+
+def extract_tools_discriptions(tools: List[Any]) -> str:
+    """Get the descriptions of the tools available to the agent"""
+    logger.info("Extracting tool descriptions")
+    try:
+        tools_description = []
+        for i, tool in enumerate(tools):
+            try:
+                # Get tool properties
+                params = tool.inputSchema
+                desc = getattr(tool, 'description', 'No description available')
+                name = getattr(tool, 'name', f'tool_{i}')
+
+                # Format the input schema in a more readable way
+                param_details = []
+
+                # Check if we have $defs (Pydantic models)
+                if '$defs' in params:
+                    # Get the input model name from the ref
+                    input_ref = params['properties']['input']['$ref']
+                    model_name = input_ref.split('/')[-1]
+
+                    # Get the model definition
+                    model_def = params['$defs'][model_name]
+
+                    # Extract parameters from the model
+                    for param_name, param_info in model_def['properties'].items():
+                        param_type = param_info.get('type', 'unknown')
+                        # Optional fields are described as anyOf the type and null
+                        if 'anyOf' in param_info:
+                            types = [t['type'] for t in param_info['anyOf'] if t.get('type', 'null') != 'null']
+                            param_type = f"{types[0] if types else 'unknown'} (optional)"
+                        param_details.append(f"{param_name}: {param_type}")
+                else:
+                    # Handle simple parameters
+                    for param_name, param_info in params.get('properties', {}).items():
+                        param_type = param_info.get('type', 'unknown')
+                        param_details.append(f"{param_name}: {param_type}")
+
+                params_str = ', '.join(param_details) if param_details else 'no parameters'
+
+                # Get return type from the tool's return type annotation
+                return_type = getattr(tool, 'return_type', 'unknown')
+                if hasattr(return_type, '__origin__'):
+                    if return_type.__origin__ is list:
+                        inner_type = return_type.__args__[0]
+                        if hasattr(inner_type, '__name__'):
+                            return_type_str = f"list[{inner_type.__name__}]"
+                        else:
+                            return_type_str = "list"
+                    else:
+                        return_type_str = str(return_type)
+                elif hasattr(return_type, '__name__'):
+                    return_type_str = return_type.__name__
+                else:
+                    return_type_str = str(return_type)
+
+                tool_desc = f"{i+1}. {name}({params_str}) - {desc}"
+                tools_description.append(tool_desc)
+                print(f"Added description for tool: {tool_desc}")
+            except Exception as e:
+                print(f"Error processing tool {i}: {e}")
+                tools_description.append(f"{i+1}. Error processing tool")
+
+        tools_description = "\n".join(tools_description)
+        print("Successfully created tools description")
+    except Exception as e:
+        print(f"Error creating tools description: {e}")
+        tools_description = "Error loading tools"
+
+    return tools_description
+
+class ToolIndex:
+    """
+    BM25 keyword index over tool names, descriptions and parameter names.
+    Name words are counted three times, they describe the tool best.
+    """
+    def __init__(self, tools: List[Any], core_tools: List[str] = CORE_TOOLS, k1: float = 1.2, b: float = 0.75):
+        self.tools = tools
+        self.core_tools = set(core_tools)
+        self.k1 = k1
+        self.b = b
+        self.documents: Dict[str, Counter] = {}
+        for tool in tools:
+            tokens = tokenize(tool.name.replace("_", " ")) * 3
+            tokens += tokenize(getattr(tool, 'description', None) or "")
+            tokens += tokenize(" ".join(tool_parameters(tool)).replace("_", " "))
+            self.documents[tool.name] = Counter(tokens)
+
+        self.average_length = sum(sum(doc.values()) for doc in self.documents.values()) / max(len(self.documents), 1)
+        document_frequency = Counter(token for doc in self.documents.values() for token in doc)
+        count = len(self.documents)
+        self.idf = {
+            token: math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            for token, frequency in document_frequency.items()
+        }
+
+    def scores(self, query: str) -> Dict[str, float]:
+        """BM25 score of every tool for the query"""
+        query_tokens = Counter(expand_synonyms(tokenize(query)))
+        scores = {}
+        for name, doc in self.documents.items():
+            length = sum(doc.values())
+            score = 0.0
+            for token, query_count in query_tokens.items():
+                frequency = doc.get(token, 0)
+                if frequency:
+                    norm = frequency + self.k1 * (1 - self.b + self.b * length / self.average_length)
+                    score += query_count * self.idf[token] * frequency * (self.k1 + 1) / norm
+            scores[name] = score
+        return scores
+
+    def select(self, query: str, k: int) -> List[Any]:
+        """
+        Return the top k tools for the query plus the core tools, in registry order.
+        All tools are returned when fewer than k tools match the query at all.
+        """
+        if k <= 0 or k >= len(self.tools):
+            return self.tools
+        scores = self.scores(query)
+        # Core tools are always offered, they must not take up any of the k slots
+        ranked = sorted(
+            (name for name in scores if scores[name] > 0 and name not in self.core_tools),
+            key=lambda name: -scores[name]
+        )
+        if len(ranked) < k:
+            # Too few tools share words with the query to trust the ranking, e.g. "tick off the laundry item"
+            logger.info(f"Only {len(ranked)} tools match the query, selecting all tools")
+            return self.tools
+        selected = set(ranked[:k]) | self.core_tools
+        logger.info(f"Selected tools: {ranked[:k]} plus core tools")
+        return [tool for tool in self.tools if tool.name in selected]
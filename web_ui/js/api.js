@@ -14,8 +14,8 @@ class ApiService {
         this.initializeRoutes();
         this.loadNotes();
         this.initializeReminders();
-        this.startReminderChecker();
-        this.startPolling();
+        this.subscribeToReminders();
+        this.subscribeToNotes();
     }
 
     /**
@@ -78,6 +78,41 @@ class ApiService {
         });
     }
 
+    /**
+     * Subscribe to due reminders pushed by the reminder scheduler,
+     * falls back to checking reminders locally when it is not running
+     */
+    subscribeToReminders() {
+        if (typeof EventSource === 'undefined') {
+            this.startReminderChecker();
+            return;
+        }
+
+        this.reminderStream = new EventSource('/api/reminders/stream');
+
+        this.reminderStream.addEventListener('reminder', event => {
+            const reminder = JSON.parse(event.data);
+            this.triggerReminder(reminder);
+
+            // Mark reminder as triggered
+            const index = this.notes.findIndex(note => note.id === reminder.id);
+            if (index !== -1) {
+                this.notes[index].triggered = true;
+                this._saveNotes();
+            }
+            this.reminders = this.reminders.filter(r => r.id !== reminder.id);
+        });
+
+        this.reminderStream.onerror = () => {
+            // The stream is closed for good when the scheduler is not available
+            if (this.reminderStream.readyState === EventSource.CLOSED) {
+                console.warn('Reminder scheduler not available, checking reminders locally');
+                this.reminderStream = null;
+                this.startReminderChecker();
+            }
+        };
+    }
+
     /**
      * Start checking for due reminders
      */
@@ -512,8 +547,8 @@ class ApiService {
                     }
                 };
                 
-                // Add time-specific properties for blockers and reminders
-                if (note.type === 'blocker' && note.startTime && note.endTime) {
+                // Add time-specific properties for timed blockers and events, and reminders
+                if ((note.type === 'blocker' || note.type === 'event') && note.startTime && note.endTime) {
                     event.start = new Date(`${note.date}T${note.startTime}`);
                     event.end = new Date(`${note.date}T${note.endTime}`);
                     event.allDay = false;
@@ -678,6 +713,59 @@ class ApiService {
         }
     }
 
+    /**
+     * Subscribe to note changes pushed by the server,
+     * falls back to polling when server-sent events are not supported
+     */
+    subscribeToNotes() {
+        if (typeof EventSource === 'undefined') {
+            this.startPolling();
+            return;
+        }
+
+        this.noteStream = new EventSource('/api/notes/stream');
+
+        ['noteCreated', 'noteUpdated', 'noteDeleted'].forEach(eventName => {
+            this.noteStream.addEventListener(eventName, event => {
+                this.applyNoteChange(eventName, JSON.parse(event.data));
+            });
+        });
+
+        this.noteStream.addEventListener('open', async () => {
+            // Catch up on changes missed while the stream was reconnecting
+            if (this.noteStreamOpened) {
+                await this.loadNotes();
+                this.initializeReminders();
+                this.emit('noteUpdated', null);
+            }
+            this.noteStreamOpened = true;
+        });
+    }
+
+    /**
+     * Apply a note change pushed by the server to the local notes
+     * @param {String} eventName - noteCreated, noteUpdated or noteDeleted
+     * @param {Object} changedNote - Note that changed
+     */
+    applyNoteChange(eventName, changedNote) {
+        const index = this.notes.findIndex(note => note.id === changedNote.id);
+        if (eventName === 'noteDeleted') {
+            if (index !== -1) {
+                this.notes.splice(index, 1);
+            }
+        } else if (index !== -1) {
+            // Notes created from this page are already in the list
+            this.notes[index] = changedNote;
+        } else {
+            this.notes.push(changedNote);
+        }
+
+        this.lastUpdateTime = new Date().toISOString();
+        this._saveNotes();
+        this.initializeReminders();
+        this.emit(eventName, changedNote);
+    }
+
     /**
      * Start polling for updates
      */
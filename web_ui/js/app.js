@@ -469,8 +469,8 @@ class NotesManager {
             let noteContent = '';
             let dateTimeDisplay = this.formatDate(note.date);
             
-            // Add time display for blockers and reminders
-            if (note.type === 'blocker' && note.startTime && note.endTime) {
+            // Add time display for timed blockers and events, and reminders
+            if ((note.type === 'blocker' || note.type === 'event') && note.startTime && note.endTime) {
                 dateTimeDisplay += `<span class="note-time">${note.startTime} - ${note.endTime}</span>`;
             } else if (note.type === 'reminder' && note.time) {
                 dateTimeDisplay += `<span class="note-time">${note.time}</span>`;
@@ -643,7 +643,7 @@ class NotesManager {
         
         // Format date and time display
         let dateTimeDisplay = this.formatDate(note.date);
-        if (note.type === 'blocker' && note.startTime && note.endTime) {
+        if ((note.type === 'blocker' || note.type === 'event') && note.startTime && note.endTime) {
             dateTimeDisplay = `${dateTimeDisplay}, ${note.startTime} - ${note.endTime}`;
         } else if (note.type === 'reminder' && note.time) {
             dateTimeDisplay = `${dateTimeDisplay}, ${note.time}`;
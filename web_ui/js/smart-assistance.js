@@ -50,6 +50,16 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // Identify this browser to the job service, which shares its queue fairly between clients
+    function getClientId() {
+        let clientId = localStorage.getItem('clientId');
+        if (!clientId) {
+            clientId = Date.now().toString(36) + Math.random().toString(36).substr(2, 9);
+            localStorage.setItem('clientId', clientId);
+        }
+        return clientId;
+    }
+
     // Function to execute the Python script
     function executePythonScript(text) {
         // Show processing message
@@ -61,7 +71,7 @@ document.addEventListener('DOMContentLoaded', function() {
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify({ text })
+            body: JSON.stringify({ text, clientId: getClientId() })
         })
         .then(response => response.json())
         .then(data => {
@@ -37,6 +37,33 @@ function saveNotes() {
   }
 }
 
+// Reminder scheduler service (mcp_backend/reminder_scheduler.py)
+const SCHEDULER_URL = process.env.REMINDER_SCHEDULER_URL || 'http://localhost:3001';
+
+// Agent job service (mcp_backend/job_service.py)
+const JOB_SERVICE_URL = process.env.JOB_SERVICE_URL || 'http://localhost:3002';
+
+// Tell the reminder scheduler about a created, updated or deleted reminder
+function notifyScheduler(reminder, deleted = false) {
+  const url = deleted ? `${SCHEDULER_URL}/reminders/${reminder.id}` : `${SCHEDULER_URL}/reminders`;
+  const options = deleted
+    ? { method: 'DELETE' }
+    : { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(reminder) };
+
+  fetch(url, options).catch(error => {
+    console.error('Error notifying reminder scheduler:', error.message);
+  });
+}
+
+// Browsers subscribed to note changes through /api/notes/stream
+const noteSubscribers = new Set();
+
+// Push a created, updated or deleted note to every subscribed browser
+function broadcastNoteChange(event, note) {
+  const message = `event: ${event}\ndata: ${JSON.stringify(note)}\n\n`;
+  noteSubscribers.forEach(subscriber => subscriber.write(message));
+}
+
 // Generate a unique ID
 function generateId() {
   return Date.now().toString(36) + Math.random().toString(36).substr(2, 5);
@@ -72,6 +99,25 @@ app.get('/api/notes', (req, res) => {
   res.json(filteredNotes);
 });
 
+// GET /api/notes/stream
+// Note changes as server-sent events, so browsers do not have to poll for them
+app.get('/api/notes/stream', (req, res) => {
+  res.writeHead(200, {
+    'Content-Type': 'text/event-stream',
+    'Cache-Control': 'no-cache',
+    'Connection': 'keep-alive'
+  });
+  res.write('retry: 5000\n\n');
+  noteSubscribers.add(res);
+
+  // Keep idle connections from being closed by proxies
+  const ping = setInterval(() => res.write(': ping\n\n'), 15000);
+  req.on('close', () => {
+    clearInterval(ping);
+    noteSubscribers.delete(res);
+  });
+});
+
 // GET /api/notes/:id
 app.get('/api/notes/:id', (req, res) => {
   const note = notes.find(note => note.id === req.params.id);
@@ -96,6 +142,7 @@ app.post('/api/todos', (req, res) => {
   
   notes.push(newTodo);
   saveNotes();
+  broadcastNoteChange('noteCreated', newTodo);
   
   res.json(newTodo);
 });
@@ -113,6 +160,7 @@ app.post('/api/events', (req, res) => {
   
   notes.push(newEvent);
   saveNotes();
+  broadcastNoteChange('noteCreated', newEvent);
   
   res.json(newEvent);
 });
@@ -130,6 +178,7 @@ app.post('/api/blockers', (req, res) => {
   
   notes.push(newBlocker);
   saveNotes();
+  broadcastNoteChange('noteCreated', newBlocker);
   
   res.json(newBlocker);
 });
@@ -148,6 +197,8 @@ app.post('/api/reminders', (req, res) => {
   
   notes.push(newReminder);
   saveNotes();
+  notifyScheduler(newReminder);
+  broadcastNoteChange('noteCreated', newReminder);
   
   res.json(newReminder);
 });
@@ -165,6 +216,10 @@ app.put('/api/notes/:id', (req, res) => {
     
     notes[index] = updatedNote;
     saveNotes();
+    broadcastNoteChange('noteUpdated', updatedNote);
+    if (updatedNote.type === 'reminder') {
+      notifyScheduler(updatedNote);
+    }
     
     res.json(updatedNote);
   } else {
@@ -179,6 +234,10 @@ app.delete('/api/notes/:id', (req, res) => {
     const deletedNote = notes[index];
     notes.splice(index, 1);
     saveNotes();
+    if (deletedNote.type === 'reminder') {
+      notifyScheduler(deletedNote, true);
+    }
+    broadcastNoteChange('noteDeleted', deletedNote);
     res.json(deletedNote);
   } else {
     res.status(404).json({ error: 'Note not found' });
@@ -205,8 +264,8 @@ app.get('/api/calendar', (req, res) => {
       }
     };
     
-    // Add time-specific properties for blockers and reminders
-    if (note.type === 'blocker' && note.startTime && note.endTime) {
+    // Add time-specific properties for timed blockers and events, and reminders
+    if ((note.type === 'blocker' || note.type === 'event') && note.startTime && note.endTime) {
       event.start = new Date(`${note.date}T${note.startTime}`);
       event.end = new Date(`${note.date}T${note.endTime}`);
       event.allDay = false;
@@ -263,12 +322,50 @@ app.post('/api/smart-output', (req, res) => {
 
 // POST /api/execute-python
 app.post('/api/execute-python', (req, res) => {
-  const { text, preferences } = req.body;
+  const { text, preferences, clientId } = req.body;
   
   if (!text) {
     return res.status(400).json({ error: 'No text provided' });
   }
   
+  // The job service shares its queue between users, every browser of the local UI has the same IP
+  const user = typeof clientId === 'string' && clientId ? `browser:${clientId.slice(0, 64)}` : req.ip;
+
+  // Queue the request on the job service (mcp_backend/job_service.py) when it is running
+  fetch(`${JOB_SERVICE_URL}/jobs`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ text, preferences, user })
+  })
+    .then(async response => {
+      const job = await response.json();
+      if (response.status === 429) {
+        // Either the whole queue or this browser's share of it (--max-per-user) is full
+        return res.status(429).json({ error: `${job.error || 'Too many requests'}, please try again shortly` });
+      }
+      if (!response.ok) {
+        return res.status(500).json({ error: job.error || 'Error queueing Python job' });
+      }
+      // The worker sends its output directly to the API
+      res.json({ success: true, message: 'Python job queued successfully', jobId: job.id });
+    }, () => executePythonScript(text, preferences, res))
+    .catch(error => {
+      console.error('Error queueing Python job:', error);
+      if (!res.headersSent) {
+        res.status(500).json({ error: 'Error queueing Python job' });
+      }
+    });
+});
+
+// GET /api/jobs/:id
+app.get('/api/jobs/:id', (req, res) => {
+  fetch(`${JOB_SERVICE_URL}/jobs/${req.params.id}`)
+    .then(async response => res.status(response.status).json(await response.json()))
+    .catch(() => res.status(502).json({ error: 'Job service not available' }));
+});
+
+// Start a new Python agent for the request, used when the job service is not running
+function executePythonScript(text, preferences, res) {
   // Execute the Python script with the input text and preferences
   const { exec } = require('child_process');
   
@@ -292,7 +389,7 @@ app.post('/api/execute-python', (req, res) => {
     // We'll still return a success message
     res.json({ success: true, message: 'Python script executed successfully' });
   });
-});
+}
 
 // Todo specific endpoints
 app.get('/api/todos/date/:date', (req, res) => {
@@ -315,6 +412,7 @@ app.post('/api/todos/date/:date', (req, res) => {
   
   notes.push(newTodo);
   saveNotes();
+  broadcastNoteChange('noteCreated', newTodo);
   
   res.json(newTodo);
 });
@@ -325,6 +423,7 @@ app.put('/api/todos/:id/toggle', (req, res) => {
     notes[index].completed = !notes[index].completed;
     notes[index].updatedAt = new Date().toISOString();
     saveNotes();
+    broadcastNoteChange('noteUpdated', notes[index]);
     res.json(notes[index]);
   } else {
     res.status(404).json({ error: 'Todo not found' });
@@ -334,8 +433,10 @@ app.put('/api/todos/:id/toggle', (req, res) => {
 app.delete('/api/todos/:id', (req, res) => {
   const index = notes.findIndex(note => note.id === req.params.id && note.type === 'todo');
   if (index !== -1) {
+    const deletedTodo = notes[index];
     notes.splice(index, 1);
     saveNotes();
+    broadcastNoteChange('noteDeleted', deletedTodo);
     res.json({ success: true });
   } else {
     res.status(404).json({ error: 'Todo not found' });
@@ -362,6 +463,7 @@ app.post('/api/events/date/:date', (req, res) => {
   
   notes.push(newEvent);
   saveNotes();
+  broadcastNoteChange('noteCreated', newEvent);
   
   res.json(newEvent);
 });
@@ -369,8 +471,10 @@ app.post('/api/events/date/:date', (req, res) => {
 app.delete('/api/events/:id', (req, res) => {
   const index = notes.findIndex(note => note.id === req.params.id && note.type === 'event');
   if (index !== -1) {
+    const deletedEvent = notes[index];
     notes.splice(index, 1);
     saveNotes();
+    broadcastNoteChange('noteDeleted', deletedEvent);
     res.json({ success: true });
   } else {
     res.status(404).json({ error: 'Event not found' });
@@ -398,6 +502,8 @@ app.post('/api/reminders/date/:date', (req, res) => {
   
   notes.push(newReminder);
   saveNotes();
+  notifyScheduler(newReminder);
+  broadcastNoteChange('noteCreated', newReminder);
   
   res.json(newReminder);
 });
@@ -405,14 +511,35 @@ app.post('/api/reminders/date/:date', (req, res) => {
 app.delete('/api/reminders/:id', (req, res) => {
   const index = notes.findIndex(note => note.id === req.params.id && note.type === 'reminder');
   if (index !== -1) {
+    const deletedReminder = notes[index];
     notes.splice(index, 1);
     saveNotes();
+    notifyScheduler(deletedReminder, true);
+    broadcastNoteChange('noteDeleted', deletedReminder);
     res.json({ success: true });
   } else {
     res.status(404).json({ error: 'Reminder not found' });
   }
 });
 
+// Due reminders pushed by the reminder scheduler, streamed to the browser as server-sent events
+app.get('/api/reminders/stream', (req, res) => {
+  const http = require('http');
+  const upstream = http.get(`${SCHEDULER_URL}/events`, schedulerRes => {
+    res.writeHead(schedulerRes.statusCode, schedulerRes.headers);
+    schedulerRes.pipe(res);
+  });
+
+  upstream.on('error', error => {
+    console.error('Error connecting to reminder scheduler:', error.message);
+    if (!res.headersSent) {
+      res.status(502).json({ error: 'Reminder scheduler not available' });
+    }
+  });
+
+  req.on('close', () => upstream.destroy());
+});
+
 // Start the server
 app.listen(port, () => {
   console.log(`Server running at http://localhost:${port}`);